@@ -1,7 +1,8 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.db.session import get_db
 from app.core.deps import get_current_user, require_admin
 from app.models import User
@@ -15,14 +16,23 @@ from app.services.knowledge import tenant_kb_service
 router = APIRouter(prefix="/kb", tags=["Knowledge Base"])
 
 
+def _schedule_indexing(background_tasks: BackgroundTasks, tenant_id: int) -> None:
+    """Re-index the tenant's changed articles after the response is sent (KB_AUTO_INDEX)."""
+    if get_settings().kb_auto_index:
+        background_tasks.add_task(tenant_kb_service.index_tenant_kb_in_background, tenant_id)
+
+
 @router.post("/articles", response_model=KBArticleResponse, status_code=status.HTTP_201_CREATED)
 def create_article(
     data: KBArticleCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Create a new KB article (Admin only)."""
-    return tenant_kb_service.create_article(db, current_user.tenant_id, data)
+    article = tenant_kb_service.create_article(db, current_user.tenant_id, data)
+    _schedule_indexing(background_tasks, current_user.tenant_id)
+    return article
 
 
 @router.get("/articles", response_model=List[KBArticleResponse])
@@ -52,6 +62,7 @@ def get_article(
 def update_article(
     article_id: int,
     data: KBArticleUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
@@ -59,12 +70,15 @@ def update_article(
     article = tenant_kb_service.get_article(db, current_user.tenant_id, article_id)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
-    return tenant_kb_service.update_article(db, article, data)
+    article = tenant_kb_service.update_article(db, article, data)
+    _schedule_indexing(background_tasks, current_user.tenant_id)
+    return article
 
 
 @router.delete("/articles/{article_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_article(
     article_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
@@ -73,11 +87,13 @@ def delete_article(
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
     tenant_kb_service.delete_article(db, article)
+    _schedule_indexing(background_tasks, current_user.tenant_id)
 
 
 @router.post("/articles/bulk", status_code=status.HTTP_201_CREATED)
 def bulk_create_articles(
     data: KBBulkIngest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
@@ -86,16 +102,19 @@ def bulk_create_articles(
     for article_data in data.articles:
         tenant_kb_service.create_article(db, current_user.tenant_id, article_data)
         created += 1
+    # One indexing run for the whole batch
+    _schedule_indexing(background_tasks, current_user.tenant_id)
     return {"created": created}
 
 
 @router.post("/index")
 def index_kb(
+    incremental: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
-    """Re-index all KB articles into FAISS (Admin only)."""
-    chunks = tenant_kb_service.index_tenant_kb(db, current_user.tenant_id)
+    """Re-index all KB articles into FAISS, or with incremental=true only changed ones (Admin only)."""
+    chunks = tenant_kb_service.index_tenant_kb(db, current_user.tenant_id, incremental=incremental)
     return {"indexed_chunks": chunks}
 
 
@@ -1,10 +1,10 @@
-from typing import List
+from typing import Dict, List
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.core.deps import get_current_user
+from app.core.deps import get_current_user, require_admin
 from app.models import User
 from app.services.knowledge import (
     search_global_kb,
@@ -13,7 +13,14 @@ from app.services.knowledge import (
     retrieve_context,
     format_context_for_prompt,
 )
+from app.services.knowledge.retrieval_cache import get_retrieval_cache_stats
 from app.services.knowledge.tenant_kb_service import search_tenant_kb
+from app.services.embeddings import (
+    get_store_cache_stats,
+    get_embedding_cache_stats,
+    get_query_cache_stats,
+    get_query_batcher_stats,
+)
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
@@ -32,6 +39,8 @@ class UnifiedSearchResponse(BaseModel):
     corrections: List[SearchResult]
     merged: List[SearchResult]
     formatted_context: str
+    timings_ms: Dict[str, float] = {}
+    degraded_sources: List[str] = []
 
 
 @router.get("/global", response_model=List[SearchResult])
@@ -105,5 +114,27 @@ def unified_search(
         examples=[to_search_result(r) for r in context.examples],
         corrections=[to_search_result(r) for r in context.corrections],
         merged=[to_search_result(r) for r in context.merged],
-        formatted_context=format_context_for_prompt(context)
+        formatted_context=format_context_for_prompt(context),
+        timings_ms={name: round(ms, 2) for name, ms in context.timings.items()},
+        degraded_sources=context.degraded_sources,
     )
+
+
+def _own_tenant_only(stats: Dict, tenant_id: int) -> Dict:
+    """Drop other tenants' per-tenant counters; ADMIN is a per-tenant role."""
+    if "by_tenant" not in stats:
+        return stats
+    key = str(tenant_id)
+    return {**stats, "by_tenant": {k: v for k, v in stats["by_tenant"].items() if k == key}}
+
+
+@router.get("/cache-stats")
+def cache_stats(current_user: User = Depends(require_admin)):
+    """Vector store, embedding and retrieval cache counters for this worker process (Admin only)."""
+    return {
+        "vector_stores": get_store_cache_stats(),
+        "embeddings": get_embedding_cache_stats(),
+        "queries": _own_tenant_only(get_query_cache_stats(), current_user.tenant_id),
+        "query_batching": get_query_batcher_stats(),
+        "retrieval": _own_tenant_only(get_retrieval_cache_stats(), current_user.tenant_id),
+    }
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict
 
 
 class Settings(BaseSettings):
@@ -20,6 +21,72 @@ class Settings(BaseSettings):
     # OpenRouter
     openrouter_api_key: str = ""
 
+    # Vector store cache (per worker process)
+    vector_store_cache_max_entries: int = 256
+    vector_store_cache_max_mb: int = 2048
+    vector_store_mmap: bool = True  # Share index pages across workers via read-only mmap
+    # Approximate search for large stores (0 rows = always exact, the default). IVF trades
+    # recall for latency: on benchmarks/bench_ann.py, 60000x1536 exact is ~36 ms/query, while
+    # nprobe 16 is ~8 ms at recall@10 0.85 and nprobe 64 ~45 ms at 0.93; at 20000x256 nprobe 16
+    # only reaches 0.59. Measure on your own data before enabling it.
+    vector_store_ann_backend: str = "ivf"
+    vector_store_ann_min_rows: int = 0
+    vector_store_ann_lists: int = 0  # 0 = ~sqrt(rows)
+    vector_store_ann_nprobe: int = 16
+    # Compact copy scanned first: float32 (off), float16, bfloat16 or int8
+    vector_store_storage: str = "float32"
+    vector_store_rescore_factor: int = 4  # Rescore top_k * factor at full precision (0 = off)
+    # Shortened embedding size per store, e.g. {"tenant_kb": 512, "tenant_7/tenant_examples": 256};
+    # keys are store names or "{tenant_N|global}/{name}". Unlisted stores use the full 1536.
+    vector_store_dimensions: Dict[str, int] = {}
+
+    # Embedding backend: "openai" (also any OpenAI-compatible server via base_url) or "hashing" (offline)
+    embedding_backend: str = "openai"
+    embedding_model: str = ""  # Backend default when empty
+    embedding_dimension: int = 1536
+    embedding_base_url: str = ""
+    embedding_api_key: str = ""  # Falls back to OPENAI_API_KEY
+
+    # Persistent document embedding cache, shared by workers on the host
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "data/cache/embeddings.sqlite"
+    embedding_cache_max_mb: int = 1024
+    # Embedding API requests: tokens per request and parallel requests per process
+    embedding_batch_max_tokens: int = 100000
+    embedding_max_concurrency: int = 4
+    # Coalesce concurrent embed_query calls arriving within this window (0 = off) into one request;
+    # a query with nothing queued or in flight is sent at once
+    embedding_coalesce_window_ms: int = 10
+    embedding_coalesce_max_batch: int = 64
+    # In-memory query embedding cache (per worker process; 0 entries = off)
+    query_cache_max_entries: int = 10000
+    query_cache_max_mb: int = 128
+    query_cache_ttl_seconds: int = 3600
+    # Global KB ingest: processes reading/chunking files (0 = one per CPU) and chunks per
+    # embedding batch; each batch is checkpointed so an interrupted ingest resumes
+    ingest_workers: int = 0
+    ingest_embed_batch_chunks: int = 2000
+    # Incrementally re-index a tenant's KB in the background after article create/update/delete
+    kb_auto_index: bool = True
+
+    # Retrieval ranking: "vector", "hybrid" (vector + BM25 via reciprocal rank fusion) or "lexical"
+    retrieval_mode: str = "vector"
+    # Fall back to lexical retrieval when embedding the query takes longer than this (0 = wait)
+    retrieval_embed_timeout_ms: int = 0
+    # The four sources are searched in parallel; any source slower than this is dropped (0 = wait)
+    retrieval_source_timeout_ms: int = 2000
+    retrieval_max_workers: int = 32
+    # Cache of retrieve_context results, invalidated by any write to the searched stores (0 entries = off)
+    retrieval_cache_max_entries: int = 2000
+    retrieval_cache_ttl_seconds: int = 600
+    # Second-stage reranker scorer: "vector" (stored vectors, no API call) or "lexical"
+    rerank_scorer: str = "vector"
+    # Maximal Marginal Relevance in generate_reply: relevance vs novelty (1.0 = plain ranking),
+    # picks per source type (0 = no cap), and the cosine at which chunks count as duplicates
+    rerank_mmr_lambda: float = 0.7
+    rerank_max_per_source: int = 0
+    rerank_max_similarity: float = 0.95
+
     class Config:
         env_file = ".env"
 
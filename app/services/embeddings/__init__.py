@@ -1,14 +1,46 @@
-from app.services.embeddings.embedding_service import embed_texts, embed_query, get_embedding_dimension
+from app.services.embeddings.embedding_service import (
+    embed_texts,
+    embed_query,
+    get_embedding_dimension,
+    truncate_embeddings,
+    get_query_batcher_stats,
+)
+from app.services.embeddings.embedding_backends import (
+    EmbeddingBackend,
+    get_embedding_backend,
+    register_embedding_backend,
+)
+from app.services.embeddings.embedding_cache import get_embedding_cache, get_embedding_cache_stats
+from app.services.embeddings.query_cache import get_query_cache, get_query_cache_stats
 from app.services.embeddings.chunker import chunk_text, chunk_markdown
-from app.services.embeddings.faiss_store import FAISSStore, get_global_kb_store, get_tenant_store
+from app.services.embeddings.faiss_store import FAISSStore, StoreChangedError, StoreDataMissingError
+from app.services.embeddings.store_registry import (
+    get_global_kb_store,
+    get_tenant_store,
+    get_store_registry,
+    get_store_cache_stats,
+)
 
 __all__ = [
     "embed_texts",
     "embed_query",
     "get_embedding_dimension",
+    "truncate_embeddings",
+    "get_query_batcher_stats",
+    "EmbeddingBackend",
+    "get_embedding_backend",
+    "register_embedding_backend",
+    "get_embedding_cache",
+    "get_embedding_cache_stats",
+    "get_query_cache",
+    "get_query_cache_stats",
     "chunk_text",
     "chunk_markdown",
     "FAISSStore",
+    "StoreChangedError",
+    "StoreDataMissingError",
     "get_global_kb_store",
     "get_tenant_store",
+    "get_store_registry",
+    "get_store_cache_stats",
 ]
@@ -0,0 +1,174 @@
+"""Approximate nearest-neighbour index backends for FAISSStore."""
+
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple, Type
+
+import numpy as np
+
+
+def matrix_fingerprint(vectors: np.ndarray) -> str:
+    """Cheap identity check that an on-disk ANN index was built for this exact matrix."""
+    if vectors.shape[0] == 0:
+        return f"0x{vectors.shape[1]}"
+    edge = np.concatenate([np.asarray(vectors[0]), np.asarray(vectors[-1])])
+    return f"{vectors.shape[0]}x{vectors.shape[1]}:{zlib.crc32(edge.tobytes()):08x}"
+
+
+class VectorIndex(ABC):
+    """
+    Candidate generator over a store's (unit-normalized) base matrix.
+
+    `search` returns (rows, scores) for the candidates it examined; the store
+    merges them with its unindexed tail and does the final top-k selection.
+    rows=None means "scores covers every row in order" (exact scan).
+    """
+
+    fingerprint: str = ""
+
+    @abstractmethod
+    def build(self, vectors: np.ndarray) -> None:
+        ...
+
+    @abstractmethod
+    def search(self, vectors: np.ndarray, query: np.ndarray, top_k: int) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        ...
+
+    @abstractmethod
+    def save(self, f: BinaryIO) -> None:
+        """Write the trained index (and its fingerprint) to a binary file."""
+
+    @classmethod
+    @abstractmethod
+    def load(cls, path: Path, **params) -> Optional["VectorIndex"]:
+        """Read an index written by `save`, or None if there isn't one."""
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force scan: a single matvec over all rows."""
+
+    def __init__(self, **params):
+        pass
+
+    def build(self, vectors: np.ndarray) -> None:
+        self.fingerprint = matrix_fingerprint(vectors)
+
+    def search(self, vectors, query, top_k):
+        return None, vectors @ query
+
+    def save(self, f: BinaryIO) -> None:
+        np.savez(f, fingerprint=np.array(self.fingerprint))
+
+    @classmethod
+    def load(cls, path: Path, **params) -> Optional["ExactIndex"]:
+        if not path.exists():
+            return None
+        with np.load(str(path)) as data:
+            index = cls()
+            index.fingerprint = str(data["fingerprint"])
+        return index
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: spherical k-means centroids, each row filed under its nearest one.
+
+    A query scores the centroids, then exactly scores only rows in the
+    `nprobe` best lists. Recall/latency knobs: `n_lists` (default ~sqrt(N))
+    and `nprobe` (more lists probed = higher recall, more rows scanned).
+    """
+
+    TRAIN_SAMPLE = 32768
+    TRAIN_ITERATIONS = 10
+    ASSIGN_BATCH = 8192
+
+    def __init__(self, n_lists: int = 0, nprobe: int = 16, seed: int = 0):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: np.ndarray = None
+        self._order: np.ndarray = None  # Row ids grouped by list
+        self._offsets: np.ndarray = None  # List c owns _order[_offsets[c]:_offsets[c + 1]]
+
+    def build(self, vectors: np.ndarray) -> None:
+        n = vectors.shape[0]
+        n_lists = self.n_lists or int(np.clip(np.sqrt(n), 16, 4096))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(self.seed)
+
+        sample_rows = np.sort(rng.choice(n, size=min(n, max(self.TRAIN_SAMPLE, n_lists * 4)), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+
+        for _ in range(self.TRAIN_ITERATIONS):
+            assign = self._assign(sample, centroids)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=n_lists)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[order], starts[~empty], axis=0)
+            if empty.any():
+                # Re-seed empty lists from random sample rows
+                sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()), replace=False)]
+            centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-9)
+
+        self.centroids = centroids.astype(np.float32)
+        self._set_assignments(self._assign(vectors, self.centroids))
+        self.fingerprint = matrix_fingerprint(vectors)
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assign = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], self.ASSIGN_BATCH):
+            batch = np.asarray(vectors[start:start + self.ASSIGN_BATCH], dtype=np.float32)
+            assign[start:start + batch.shape[0]] = np.argmax(batch @ centroids.T, axis=1)
+        return assign
+
+    def _set_assignments(self, assign: np.ndarray) -> None:
+        self._order = np.argsort(assign, kind="stable").astype(np.int64)
+        self._offsets = np.searchsorted(assign[self._order], np.arange(self.centroids.shape[0] + 1))
+
+    def search(self, vectors, query, top_k):
+        nprobe = min(self.nprobe, self.centroids.shape[0])
+        probe = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+        rows = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in probe])
+        if rows.shape[0] < top_k:
+            # Too few candidates in the probed lists; fall back to an exact scan
+            return None, vectors @ query
+        rows.sort()  # Sequential access pattern for the (possibly memory-mapped) matrix
+        return rows, vectors[rows] @ query
+
+    def save(self, f: BinaryIO) -> None:
+        assign = np.empty(self._order.shape[0], dtype=np.int32)
+        for c in range(self.centroids.shape[0]):
+            assign[self._order[self._offsets[c]:self._offsets[c + 1]]] = c
+        np.savez(f, centroids=self.centroids, assign=assign, fingerprint=np.array(self.fingerprint))
+
+    @classmethod
+    def load(cls, path: Path, **params) -> Optional["IVFIndex"]:
+        if not path.exists():
+            return None
+        with np.load(str(path)) as data:
+            index = cls(**params)
+            index.centroids = data["centroids"]
+            index._set_assignments(data["assign"])
+            index.fingerprint = str(data["fingerprint"])
+        return index
+
+
+ANN_BACKENDS: Dict[str, Type[VectorIndex]] = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
+
+
+def register_ann_backend(name: str, backend: Type[VectorIndex]) -> None:
+    """Make an index backend selectable by name (e.g. via VECTOR_STORE_ANN_BACKEND)."""
+    ANN_BACKENDS[name] = backend
+
+
+def get_ann_backend(name: str) -> Type[VectorIndex]:
+    if name not in ANN_BACKENDS:
+        raise ValueError(f"Unknown ANN backend '{name}'. Available: {sorted(ANN_BACKENDS)}")
+    return ANN_BACKENDS[name]
@@ -0,0 +1,61 @@
+"""Token counting, truncation and request batching for embedding inputs."""
+
+import logging
+import threading
+from typing import List, Tuple
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(model: str):
+    """tiktoken encoding for `model`, or None if it can't be loaded (e.g. no network to fetch the BPE file)."""
+    if model not in _encodings:
+        with _encodings_lock:
+            if model not in _encodings:
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except Exception:
+                    logger.warning("No tiktoken encoding for %s; bounding inputs by UTF-8 bytes instead", model)
+                    _encodings[model] = None
+    return _encodings[model]
+
+
+def fit_to_tokens(text: str, max_tokens: int, model: str) -> Tuple[str, int]:
+    """
+    Truncate `text` to at most `max_tokens` tokens; returns (text, token count).
+
+    Without a tokenizer the UTF-8 byte length stands in for the token count:
+    every BPE token covers at least one byte, so it is a safe upper bound.
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        data = text.encode("utf-8")
+        if len(data) > max_tokens:
+            text = data[:max_tokens].decode("utf-8", errors="ignore")
+        return text, min(len(data), max_tokens)
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    # Decoding a token prefix can merge differently on re-encode; leave a little headroom
+    truncated = encoding.decode(tokens[:max_tokens - 8])
+    return truncated, len(encoding.encode(truncated, disallowed_special=()))
+
+
+def token_batches(token_counts: List[int], max_tokens: int, max_inputs: int) -> List[Tuple[int, int]]:
+    """Split consecutive inputs into [start, end) batches under both the token and input-count limits."""
+    batches = []
+    start, batch_tokens = 0, 0
+    for i, count in enumerate(token_counts):
+        if i > start and (batch_tokens + count > max_tokens or i - start >= max_inputs):
+            batches.append((start, i))
+            start, batch_tokens = i, 0
+        batch_tokens += count
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
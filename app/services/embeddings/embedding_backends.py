@@ -0,0 +1,177 @@
+"""Embedding backends selectable by name (EMBEDDING_BACKEND)."""
+
+import os
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+from openai import OpenAI
+
+from app.config import get_settings
+from app.services.embeddings.batching import fit_to_tokens
+
+
+class EmbeddingBackend(ABC):
+    """
+    Turns a batch of texts into float32 vectors with one request.
+
+    Batching, caching and concurrency live in embedding_service; a backend
+    only says how to embed one batch and how long a single input may be.
+    `model` names the vector space (it keys the embedding caches).
+    """
+
+    model: str
+    dimension: int
+    max_input_tokens: int = 8191
+
+    @abstractmethod
+    def embed(self, texts: List[str], dimensions: Optional[int] = None) -> np.ndarray:
+        """Embed `texts` (already fitted), shortened to `dimensions` when given."""
+
+    def fit(self, text: str) -> Tuple[str, int]:
+        """Truncate one input to the backend's limit; returns (text, token count)."""
+        return fit_to_tokens(text, self.max_input_tokens, self.model)
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    OpenAI embeddings API, or any OpenAI-compatible server via `base_url`
+    (vLLM, Ollama, LM Studio, text-embeddings-inference, ...).
+
+    `dimensions=` is only sent to the official API; for other servers shorter
+    vectors are produced by truncating and re-normalizing client-side.
+    """
+
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        dimension: int = 1536,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        **params,
+    ):
+        self.model = model
+        self.dimension = dimension
+        self.base_url = base_url or None
+        # Local servers usually ignore the key, but the client requires one
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY") or ("unused" if self.base_url else None)
+        self._client: Optional[OpenAI] = None
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def embed(self, texts: List[str], dimensions: Optional[int] = None) -> np.ndarray:
+        shorten = dimensions is not None and dimensions < self.dimension
+        kwargs = {"dimensions": dimensions} if shorten and self.base_url is None else {}
+        response = self.client.embeddings.create(model=self.model, input=texts, **kwargs)
+
+        embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        vectors = np.array(embeddings, dtype=np.float32)
+        if shorten and vectors.shape[1] > dimensions:
+            vectors = vectors[:, :dimensions]
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+        return vectors
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic offline embeddings: signed feature hashing of words and
+    character n-grams, log-scaled and unit-normalized. No network, no model.
+
+    Texts sharing words and substrings get similar vectors, which is enough
+    to load-test and benchmark the retrieval stack at realistic scale; it is
+    not a semantic model.
+    """
+
+    WORD_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, model: str = "hashing-ngram", dimension: int = 1536, ngram_range=(3, 5), **params):
+        self.model = f"{model}-{ngram_range[0]}-{ngram_range[1]}"
+        self.dimension = dimension
+        self.ngram_range = tuple(ngram_range)
+
+    def fit(self, text: str) -> Tuple[str, int]:
+        # No input limit; the estimate only sizes batches
+        return text, len(text) // 4 + 1
+
+    def embed(self, texts: List[str], dimensions: Optional[int] = None) -> np.ndarray:
+        dim = dimensions if dimensions and dimensions < self.dimension else self.dimension
+        vectors = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            hashes = self._feature_hashes(text)
+            if hashes.shape[0] == 0:
+                continue
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+            counts = np.bincount((hashes % np.uint64(dim)).astype(np.int64), weights=signs, minlength=dim)
+            vectors[i] = np.sign(counts) * np.log1p(np.abs(counts))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+        return vectors
+
+    def _feature_hashes(self, text: str) -> np.ndarray:
+        text = " ".join(text.lower().split())
+        # Whole words (keeps exact tokens like error codes distinct) ...
+        words = [zlib.crc32(word.encode("utf-8")) for word in self.WORD_PATTERN.findall(text)]
+        parts = [np.array(words, dtype=np.uint64) << np.uint64(32)]
+        # ... plus every character n-gram, hashed with a vectorized polynomial rolling hash
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            if data.shape[0] < n:
+                break
+            h = np.full(data.shape[0] - n + 1, n, dtype=np.uint64)
+            for k in range(n):
+                h = h * np.uint64(1000003) + data[k:data.shape[0] - n + 1 + k]
+            parts.append(h)
+        return _mix64(np.concatenate(parts))
+
+
+def _mix64(h: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, so bucket index and sign bits are well spread."""
+    with np.errstate(over="ignore"):
+        h = h + np.uint64(0x9E3779B97F4A7C15)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return h ^ (h >> np.uint64(31))
+
+
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    "openai": OpenAIEmbeddingBackend,
+    "hashing": HashingEmbeddingBackend,
+}
+
+
+def register_embedding_backend(name: str, backend: Type[EmbeddingBackend]) -> None:
+    """Make an embedding backend selectable by name (e.g. via EMBEDDING_BACKEND)."""
+    EMBEDDING_BACKENDS[name] = backend
+
+
+_backend: Optional[EmbeddingBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """Process-wide backend configured by EMBEDDING_BACKEND / EMBEDDING_MODEL / EMBEDDING_BASE_URL."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                settings = get_settings()
+                if settings.embedding_backend not in EMBEDDING_BACKENDS:
+                    raise ValueError(
+                        f"Unknown embedding backend '{settings.embedding_backend}'. "
+                        f"Available: {sorted(EMBEDDING_BACKENDS)}"
+                    )
+                params = {"dimension": settings.embedding_dimension}
+                if settings.embedding_model:
+                    params["model"] = settings.embedding_model
+                if settings.embedding_base_url:
+                    params["base_url"] = settings.embedding_base_url
+                if settings.embedding_api_key:
+                    params["api_key"] = settings.embedding_api_key
+                _backend = EMBEDDING_BACKENDS[settings.embedding_backend](**params)
+    return _backend
@@ -0,0 +1,159 @@
+"""Persistent embedding cache keyed by (model, dimension, sha256(text))."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import get_settings
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed cache of document embeddings, shared by all worker processes.
+
+    Unchanged texts are never sent to the embedding API twice: store rebuilds
+    and reranks of already-seen chunks are served from here. Entries are
+    evicted least-recently-used once the stored vectors exceed `max_bytes`.
+    """
+
+    # Evict down to this share of the budget so eviction isn't run on every write
+    EVICT_TO = 0.9
+
+    def __init__(self, path: Path, max_bytes: int = 1024 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, dimension INTEGER NOT NULL, hash BLOB NOT NULL, "
+            "vector BLOB NOT NULL, last_used INTEGER NOT NULL, "
+            "PRIMARY KEY (model, dimension, hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._total_bytes = self._count_bytes()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _count_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, dimension: int, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for `texts` in order, None where missing."""
+        hashes = [text_hash(t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = list(set(hashes[start:start + 500]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dimension = ? AND hash IN ({placeholders})",
+                    [model, dimension, *batch],
+                ).fetchall()
+                found.update((h, np.frombuffer(v, dtype=np.float32)) for h, v in rows)
+            if found:
+                now = int(time.time())
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND dimension = ? AND hash = ?",
+                    [(now, model, dimension, h) for h in found],
+                )
+            result = [found.get(h) for h in hashes]
+            hit_count = sum(v is not None for v in result)
+            self.hits += hit_count
+            self.misses += len(result) - hit_count
+        return result
+
+    def put_many(self, model: str, dimension: int, texts: List[str], vectors: np.ndarray) -> None:
+        now = int(time.time())
+        records = [
+            (model, dimension, text_hash(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dimension, hash, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                records,
+            )
+            self._conn.execute("COMMIT")
+            self.writes += len(records)
+            self._total_bytes += sum(len(r[3]) for r in records)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries down to EVICT_TO of the budget. Caller holds the lock."""
+        # Recount first: other worker processes write to the same file
+        self._total_bytes = self._count_bytes()
+        excess = self._total_bytes - int(self.max_bytes * self.EVICT_TO)
+        if excess <= 0:
+            return
+        row_bytes = self._conn.execute("SELECT LENGTH(vector) FROM embeddings LIMIT 1").fetchone()[0] or 1
+        n_rows = excess // row_bytes + 1
+        deleted = self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (n_rows,),
+        ).rowcount
+        self.evictions += deleted
+        self._total_bytes = self._count_bytes()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache from settings, or None when disabled."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                if not settings.embedding_cache_enabled:
+                    return None
+                _cache = EmbeddingCache(
+                    Path(settings.embedding_cache_path),
+                    max_bytes=settings.embedding_cache_max_mb * 1024 * 1024,
+                )
+    return _cache
+
+
+def get_embedding_cache_stats() -> Dict:
+    cache = get_embedding_cache()
+    return cache.stats() if cache else {"enabled": False}
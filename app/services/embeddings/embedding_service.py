@@ -1,47 +1,155 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import threading
 import numpy as np
-from openai import OpenAI
-import os
 
-# OpenAI client singleton
-_client: OpenAI = None
+from app.config import get_settings
+from app.services.embeddings.batching import token_batches
+from app.services.embeddings.embedding_backends import get_embedding_backend
+from app.services.embeddings.embedding_cache import get_embedding_cache
+from app.services.embeddings.query_batcher import QueryBatcher
+from app.services.embeddings.query_cache import get_query_cache, normalize_query
 
-# Using text-embedding-3-small (1536 dims, good quality, cost-effective)
-EMBEDDING_MODEL = "text-embedding-3-small"
-EMBEDDING_DIMENSION = 1536
+# Vectors come from the backend selected by EMBEDDING_BACKEND (default: OpenAI
+# text-embedding-3-small, 1536 dims), see embedding_backends.py.
 
+# API limit: inputs per request
+MAX_BATCH_INPUTS = 2048
 
-def get_openai_client() -> OpenAI:
-    global _client
-    if _client is None:
-        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    return _client
+# Shared across calls so the concurrency limit holds process-wide
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
 
+_query_batcher: Optional[QueryBatcher] = None
 
-def embed_texts(texts: List[str]) -> np.ndarray:
-    """Generate embeddings for a list of texts using OpenAI."""
+
+def _effective_dimension(dimensions: Optional[int]) -> int:
+    native = get_embedding_dimension()
+    return dimensions if dimensions and dimensions < native else native
+
+
+def embed_texts(texts: List[str], dimensions: Optional[int] = None) -> np.ndarray:
+    """
+    Generate embeddings for a list of texts with the configured backend, optionally shortened to `dimensions`.
+    Texts already in the persistent embedding cache (and duplicates within the call) are not re-sent.
+    """
     if not texts:
         return np.array([])
 
-    client = get_openai_client()
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=texts
-    )
+    cache = get_embedding_cache()
+    if cache is None:
+        return _request_embeddings(texts, dimensions)
+
+    model = get_embedding_backend().model
+    dimension = _effective_dimension(dimensions)
+    vectors = cache.get_many(model, dimension, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        fetched = _request_embeddings(missing, dimensions)
+        cache.put_many(model, dimension, missing, fetched)
+        by_text = dict(zip(missing, fetched))
+        vectors = [by_text[t] if v is None else v for t, v in zip(texts, vectors)]
+    return np.array(vectors, dtype=np.float32)
 
-    embeddings = [item.embedding for item in response.data]
-    return np.array(embeddings, dtype=np.float32)
 
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, get_settings().embedding_max_concurrency),
+                    thread_name_prefix="embed",
+                )
+    return _executor
 
-def embed_query(query: str) -> np.ndarray:
-    """Generate embedding for a single query."""
-    client = get_openai_client()
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=[query]
+
+def _request_embeddings(texts: List[str], dimensions: Optional[int] = None) -> np.ndarray:
+    """
+    Call the embedding backend for `texts` (no caching).
+
+    Inputs over the model's token limit are truncated; the rest are split into
+    requests bounded by EMBEDDING_BATCH_MAX_TOKENS and MAX_BATCH_INPUTS, sent
+    concurrently (EMBEDDING_MAX_CONCURRENCY) and reassembled in input order.
+    """
+    backend = get_embedding_backend()
+    fitted = [backend.fit(text) for text in texts]
+    inputs = [text for text, _ in fitted]
+    batches = token_batches(
+        [count for _, count in fitted],
+        max_tokens=get_settings().embedding_batch_max_tokens,
+        max_inputs=MAX_BATCH_INPUTS,
     )
-    return np.array(response.data[0].embedding, dtype=np.float32)
+
+    def request(batch):
+        start, end = batch
+        return backend.embed(inputs[start:end], dimensions)
+
+    if len(batches) == 1:
+        return request(batches[0])
+    return np.vstack(list(_get_executor().map(request, batches)))
+
+
+def embed_query(query: str, dimensions: Optional[int] = None) -> np.ndarray:
+    """
+    Generate embedding for a single query.
+    Recently seen queries (after whitespace/case normalization) come from the in-memory query
+    cache; the returned vector may be shared and is read-only then.
+    """
+    cache = get_query_cache()
+    key = None
+    if cache is not None:
+        key = (get_embedding_backend().model, _effective_dimension(dimensions), normalize_query(query))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    batcher = get_query_batcher()
+    if batcher is not None:
+        # Shares one API request with other queries arriving within the coalescing window
+        embedding = batcher.embed(query, dimensions)
+    else:
+        embedding = _request_embeddings([query], dimensions)[0]
+    if cache is not None:
+        cache.put(key, embedding)
+    return embedding
+
+
+def get_query_batcher() -> Optional[QueryBatcher]:
+    """Process-wide embed_query coalescer, or None when EMBEDDING_COALESCE_WINDOW_MS is 0."""
+    global _query_batcher
+    if _query_batcher is None:
+        with _executor_lock:
+            if _query_batcher is None:
+                settings = get_settings()
+                if settings.embedding_coalesce_window_ms <= 0:
+                    return None
+                _query_batcher = QueryBatcher(
+                    _request_embeddings,
+                    window_ms=settings.embedding_coalesce_window_ms,
+                    max_batch=settings.embedding_coalesce_max_batch,
+                    max_in_flight=settings.embedding_max_concurrency,
+                )
+    return _query_batcher
+
+
+def get_query_batcher_stats() -> Dict:
+    batcher = get_query_batcher()
+    return batcher.stats() if batcher else {"enabled": False}
+
+
+def truncate_embeddings(embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Shorten embeddings to their first `dimensions` components and re-normalize.
+
+    text-embedding-3 vectors are Matryoshka-trained, so this matches asking
+    the API for `dimensions` directly and needs no new API calls.
+    """
+    truncated = np.array(embeddings[..., :dimensions], dtype=np.float32)
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    return truncated / (norms + 1e-9)
 
 
 def get_embedding_dimension() -> int:
-    return EMBEDDING_DIMENSION
+    """Native (full-size) dimension of the configured backend."""
+    return get_embedding_backend().dimension
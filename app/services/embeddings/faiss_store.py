@@ -1,120 +1,1073 @@
 import os
+import re
 import json
+import glob
+import logging
+import threading
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator, List, Dict, Optional, Set, Tuple
 from pathlib import Path
 
-from app.services.embeddings.embedding_service import embed_texts, embed_query, get_embedding_dimension
+from app.services.embeddings.embedding_service import (
+    embed_texts, embed_query, get_embedding_dimension, truncate_embeddings,
+)
+from app.services.embeddings.file_lock import FileLock
+from app.services.embeddings.lexical_index import LexicalIndex, lexical_similarity
+from app.services.embeddings.metadata_store import MetadataStore
+from app.services.embeddings.similarity import reciprocal_rank_fusion, top_k_indices
+from app.services.embeddings.ann_index import ANN_BACKENDS, VectorIndex, get_ann_backend, matrix_fingerprint
+from app.services.embeddings.quantization import (
+    STORAGE_FORMATS, QuantizedMatrix, load_quantized, quantize, quantized_header, save_quantized,
+)
 
 DATA_DIR = Path("data/indexes")
 
+# "vector": cosine similarity; "lexical": BM25 only (no embedding call); "hybrid": both, fused by rank
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (in place) so cosine similarity is a plain dot product."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= norms + 1e-9
+    return embeddings
+
+
+def _write_temp(path: Path, write_fn) -> Path:
+    """Write to a temp file beside `path` and fsync it; the caller renames it into place with _replace."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path
+
+
+def _replace(tmp_path: Path, path: Path) -> None:
+    """Rename a temp file into place and fsync the directory, so the rename itself survives a crash."""
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(str(path.parent), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _atomic_write(path: Path, write_fn) -> None:
+    """
+    Write via a temp file and rename into place.
+
+    Readers that memory-mapped the previous file keep a valid mapping of the
+    old inode instead of seeing a truncated file mid-write, and after a crash
+    the path holds either the old or the new contents, never a mix.
+    """
+    _replace(_write_temp(path, write_fn), path)
+
+
+def _write_json(path: Path, data) -> None:
+    _atomic_write(path, lambda f: f.write(json.dumps(data, ensure_ascii=False).encode('utf-8')))
+
+
+def _file_version(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _gather_rows(base: np.ndarray, tail: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """float32 copies of the given store rows, which may span the base and the segment tail."""
+    in_base = rows < base.shape[0]
+    vectors = np.empty((rows.shape[0], base.shape[1]), dtype=np.float32)
+    vectors[in_base] = base[rows[in_base]]
+    vectors[~in_base] = tail[rows[~in_base] - base.shape[0]]
+    return vectors
+
+
+class StoreChangedError(RuntimeError):
+    """A rebuild's swap was refused because the store was written after its contents were read."""
+
+
+class StoreDataMissingError(RuntimeError):
+    """Rows the manifest publishes are gone from disk (a deleted segment, lost metadata); re-ingest to restore them."""
+
 
 class FAISSStore:
-    """Simple numpy-based vector store with cosine similarity search."""
+    """
+    Numpy vector store with cosine similarity search over unit-normalized embeddings.
 
-    def __init__(self, name: str, tenant_id: Optional[int] = None):
+    On disk (under data/indexes/{global|tenant_N}/): a base matrix `{name}.npy`,
+    append-only segments listed in `{name}_manifest.json`, chunk metadata and the
+    BM25 index in `{name}_meta.sqlite`, optional `{name}_{storage}.npy` and
+    `{name}_{ann_backend}.npz` derived from the base, and `{name}.lock`. After a
+    rebuild the files are named `{name}.gN.*` and `{name}_generation.json` points
+    at the live generation. See docs/architecture-overview.md for the design.
+    """
+
+    # Compact once segments hold this share of the base rows (amortized O(1) per add) ...
+    COMPACT_RATIO = 0.25
+    COMPACT_MIN_ROWS = 1024
+    # ... or once there are this many segment files to open on load
+    MAX_SEGMENTS = 64
+    # Hybrid search fuses this many candidates per top_k result from each ranking
+    HYBRID_DEPTH = 4
+    LEXICAL_BACKFILL_BATCH = 1000
+    # rebuild_from redoes a rebuild that lost its swap to a concurrent write this many times
+    REBUILD_ATTEMPTS = 5
+
+    def __init__(
+        self,
+        name: str,
+        tenant_id: Optional[int] = None,
+        mmap: bool = False,
+        ann_backend: str = "ivf",
+        ann_min_rows: int = 0,
+        ann_params: Optional[Dict] = None,
+        storage: str = "float32",
+        rescore_factor: int = 4,
+        dimension: Optional[int] = None,
+        generation: Optional[int] = None,
+    ):
+        if storage not in STORAGE_FORMATS:
+            raise ValueError(f"Unsupported storage format '{storage}'. Available: {STORAGE_FORMATS}")
         self.name = name
         self.tenant_id = tenant_id
-        self.dimension = get_embedding_dimension()
+        self.mmap = mmap
+        self.ann_backend = ann_backend
+        self.ann_min_rows = ann_min_rows  # 0 disables approximate search
+        self.ann_params = ann_params or {}
+        self.storage = storage
+        self.rescore_factor = rescore_factor  # 0 ranks on compact scores alone
+        self.configured_dimension = dimension or get_embedding_dimension()
+        self.dimension = self.configured_dimension  # Lower if the stored vectors are narrower
 
         # Create index directory
         self.index_dir = DATA_DIR / (f"tenant_{tenant_id}" if tenant_id else "global")
         self.index_dir.mkdir(parents=True, exist_ok=True)
 
-        self.index_path = self.index_dir / f"{name}.npy"
-        self.metadata_path = self.index_dir / f"{name}_metadata.json"
+        # Names the live generation; a store built with an explicit `generation` (a rebuild's shadow) ignores it
+        self.generation_path = self.index_dir / f"{name}_generation.json"
+        self._pinned_generation = generation
+        self._generation_version: Optional[Tuple] = None
+        self.generation: Optional[int] = None  # Set with the file paths by _open_generation
 
-        # Initialize or load
-        self.embeddings: np.ndarray = None
-        self.metadata: List[Dict] = []
+        # Compacted base rows, plus rows from segments appended since the last compaction
+        self._base: np.ndarray = None
+        self._tail: np.ndarray = None
+        self._meta: Optional[MetadataStore] = None
+        self._lexical: Optional[LexicalIndex] = None
+        self._columns: Optional[Tuple[int, Dict[str, np.ndarray]]] = None
+        self._segments: List[Dict] = []  # {"id", "start", "rows"} for segments folded into _tail
+        self._next_segment = 1
+        self._ann: Optional[VectorIndex] = None
+        self._compact: Optional[QuantizedMatrix] = None
+
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._ann_building = False
+        self._epoch = 0  # Bumped whenever the base is replaced wholesale (reload/clear)
+        self._base_version: Optional[Tuple] = None
+        self._manifest_version: Optional[Tuple] = None
+        self._manifest_rows: Optional[int] = None  # Row count the manifest promises (absent in older manifests)
+        # Serializes writers across processes; always taken after self._lock
+        self._file_lock = FileLock(self.index_dir / f"{name}.lock")
+        self._repairing = False
+        # Bumped in the manifest on every write, so it identifies the contents across workers
+        self.version = 0
         self._load_or_create()
 
+    # ------------------------------------------------------------------ loading
+
     def _load_or_create(self):
-        """Load existing index or create new one."""
-        if self.index_path.exists() and self.metadata_path.exists():
-            self.embeddings = np.load(str(self.index_path))
-            with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                self.metadata = json.load(f)
-        else:
-            self.embeddings = np.zeros((0, self.dimension), dtype=np.float32)
-            self.metadata = []
+        """Load existing index (base + segments) or create new one."""
+        with self._lock:
+            self._epoch += 1
+            self._generation_version = _file_version(self.generation_path)
+            if self._pinned_generation is not None:
+                self._open_generation(self._pinned_generation)
+            else:
+                self._open_generation(self._read_generation())
+            self.dimension = self.configured_dimension
+            if self.index_path.exists():
+                self._base = self._load_embeddings()
+            else:
+                # Segments only (a store below COMPACT_MIN_ROWS): keep their width so
+                # _migrate_dimension truncates them instead of rejecting them
+                self._base = np.zeros((0, self._segment_width()), dtype=np.float32)
+            self._tail = np.zeros((0, self._base.shape[1]), dtype=np.float32)
+            self._segments = []
+            self._next_segment = 1
+            self._columns = None
+            self._base_version = self._current_base_version()
+            self._migrate_legacy_metadata()
+            self._migrate_legacy_layout()
+            self._load_new_segments()
+            if not self._repairing and not self.verify()["ok"]:
+                self.repair()
+            self._sync_lexical()
+            self._migrate_dimension()
+            self._sync_compact()
+            self._sync_ann()
 
-    def add(self, texts: List[str], metadata_list: List[Dict] = None):
-        """Add texts with optional metadata."""
-        if not texts:
+    def _read_generation(self) -> int:
+        if not self.generation_path.exists():
+            return 0
+        with open(self.generation_path, 'r', encoding='utf-8') as f:
+            return json.load(f)["generation"]
+
+    def _generation_prefix(self, generation: int) -> str:
+        return self.name if generation == 0 else f"{self.name}.g{generation}"
+
+    def _open_generation(self, generation: int) -> None:
+        """Point file paths and the SQLite sidecar at `generation`'s files. Caller holds the lock."""
+        if generation == self.generation:
             return
+        self.generation = generation
+        prefix = self._generation_prefix(generation)
+        self.index_path = self.index_dir / f"{prefix}.npy"
+        self.manifest_path = self.index_dir / f"{prefix}_manifest.json"
+        self.metadata_db_path = self.index_dir / f"{prefix}_meta.sqlite"
+        self.ann_path = self.index_dir / f"{prefix}_{self.ann_backend}.npz"
+        self.compact_path = self.index_dir / f"{prefix}_{self.storage}.npy"
+        self.compact_info_path = self.index_dir / f"{prefix}_{self.storage}.json"
+        # Pre-sidecar layout, migrated on load
+        self.legacy_metadata_path = self.index_dir / f"{prefix}_metadata.json"
+        # The previous generation's connections are left to in-flight searches holding them
+        self._meta = MetadataStore(self.metadata_db_path)
+        self._lexical = LexicalIndex(self.metadata_db_path)
+
+    def _generation_files(self, generation: int) -> List[Path]:
+        """Every file a generation may own."""
+        prefix = self._generation_prefix(generation)
+        names = [f"{prefix}.npy", f"{prefix}_manifest.json", f"{prefix}_metadata.json"]
+        names += [f"{prefix}_meta.sqlite{suffix}" for suffix in ("", "-wal", "-shm")]
+        names += [f"{prefix}_{storage}.{ext}" for storage in STORAGE_FORMATS for ext in ("npy", "json")]
+        names += [f"{prefix}_{backend}.npz" for backend in ANN_BACKENDS]
+        paths = [self.index_dir / name for name in names]
+        paths += [Path(p) for p in glob.glob(str(self.index_dir / f"{glob.escape(prefix)}_seg*"))]
+        return paths
+
+    def _generations_on_disk(self) -> Set[int]:
+        pattern = re.compile(rf"^{re.escape(self.name)}\.g(\d+)[._]")
+        generations = {0} if (self.index_dir / f"{self.name}_manifest.json").exists() else set()
+        for path in self.index_dir.glob(f"{glob.escape(self.name)}.g*"):
+            match = pattern.match(path.name)
+            if match:
+                generations.add(int(match.group(1)))
+        return generations
+
+    @property
+    def _map_base(self) -> bool:
+        # With a compact copy the float32 base is only read for rescoring
+        return self.mmap or self.storage != "float32"
 
-        new_embeddings = embed_texts(texts)
+    def _load_embeddings(self) -> np.ndarray:
+        """Load the base embedding matrix, memory-mapped read-only when enabled."""
+        if self._map_base:
+            # Zero-row arrays can't be mapped; they cost nothing to load anyway
+            embeddings = np.load(str(self.index_path), mmap_mode='r')
+            if embeddings.shape[0] > 0:
+                return embeddings
+        return np.load(str(self.index_path))
 
-        if self.embeddings.shape[0] == 0:
-            self.embeddings = new_embeddings.astype(np.float32)
+    def _migrate_legacy_layout(self):
+        """
+        Rewrite indexes saved before embeddings were stored as unit-length float32.
+        Only a sample of rows is checked so a mapped index isn't paged in on load.
+        """
+        if self._base.shape[0] == 0:
+            return
+        sample = np.asarray(self._base[:64], dtype=np.float32)
+        norms = np.linalg.norm(sample, axis=1)
+        if self._base.dtype == np.float32 and np.allclose(norms, 1.0, atol=1e-3):
+            return
+        self._base = _normalize_rows(np.array(self._base, dtype=np.float32))
+        with self._write_lock():
+            self._write_base(self._base)
+
+    def _migrate_legacy_metadata(self):
+        """Move metadata from the old JSON files (base and per-segment) into the SQLite sidecar."""
+        legacy_files = []
+        if self.legacy_metadata_path.exists():
+            legacy_files.append((0, self.legacy_metadata_path))
+        for seg in self._read_manifest()["segments"]:
+            segment_json = self._segment_path(seg["id"]).with_suffix(".json")
+            if segment_json.exists():
+                legacy_files.append((seg["start"], segment_json))
+        if not legacy_files:
+            return
+
+        with self._write_lock():
+            for start, path in legacy_files:
+                if not path.exists():
+                    continue  # Migrated by another worker meanwhile
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._meta.put(start, json.load(f))
+                path.unlink()
+
+    def _migrate_dimension(self):
+        """Truncate (and re-normalize) stored vectors wider than the configured dimension, once."""
+        stored = self._base.shape[1]
+        if stored == self.dimension:
+            return
+        if self.count == 0:
+            self._base = np.zeros((0, self.dimension), dtype=np.float32)
+            self._tail = np.zeros((0, self.dimension), dtype=np.float32)
+        elif self._manifest_rows is not None and self.count < self._manifest_rows:
+            # Rewriting now would drop the segments that failed to load; migrate on a later load
+            self.dimension = stored
+            return
+        elif stored < self.dimension:
+            # Widening needs new embeddings; keep serving at the stored size until re-ingested
+            logger.warning(
+                "Vector store %s (tenant %s) holds %d-dim vectors, configured for %d; using %d until re-ingested",
+                self.name, self.tenant_id, stored, self.dimension, stored,
+            )
+            self.dimension = stored
+            return
         else:
-            self.embeddings = np.vstack([self.embeddings, new_embeddings.astype(np.float32)])
+            self._base = truncate_embeddings(self._base, self.dimension)
+            self._tail = truncate_embeddings(self._tail, self.dimension)
+        self._save()
+
+    def _sync_lexical(self):
+        """Tokenize chunks stored before the lexical index existed. Caller holds the lock."""
+        if self._lexical.indexed_rows() >= self.count:
+            return
+        # put() drops rows past its start, so backfill must not interleave with another worker's add
+        with self._write_lock():
+            indexed = self._lexical.indexed_rows()
+            for start in range(indexed, self.count, self.LEXICAL_BACKFILL_BATCH):
+                rows = range(start, min(start + self.LEXICAL_BACKFILL_BATCH, self.count))
+                self._lexical.put(start, [meta["content"] for meta in self._meta.get(rows)])
+
+    def _read_manifest(self) -> Dict:
+        if not self.manifest_path.exists():
+            return {"segments": [], "next_segment": 1}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load_new_segments(self):
+        """
+        Append segments listed in the manifest that aren't loaded yet. Caller holds the lock.
+        Stops at a missing or unreadable segment, so only the rows before it are served;
+        verify() then reports the shortfall and repair() decides whether it is recoverable.
+        """
+        manifest = self._read_manifest()
+        self._manifest_version = _file_version(self.manifest_path)
+        self._manifest_rows = manifest.get("rows")
+        self._next_segment = max(self._next_segment, manifest.get("next_segment", 1))
+        self.version = manifest.get("version", 0)
+
+        loaded_ids = {seg["id"] for seg in self._segments}
+        base_rows = self._base.shape[0]
+        rows = self.count
+        new_vectors = []
+        for seg in manifest["segments"]:
+            # Rows below base_rows were already folded into the base by a compaction
+            if seg["id"] in loaded_ids or seg["start"] + seg["rows"] <= base_rows:
+                continue
+            path = self._segment_path(seg["id"])
+            try:
+                vectors = np.load(str(path))
+            except (OSError, ValueError):
+                logger.warning("Vector store segment %s is missing or unreadable", path)
+                break
+            if seg["start"] != rows or vectors.shape != (seg["rows"], self._tail.shape[1]):
+                logger.warning("Vector store segment %s does not match its manifest entry", path)
+                break
+            new_vectors.append(vectors)
+            self._segments.append(seg)
+            rows += seg["rows"]
+
+        if new_vectors:
+            self._tail = np.vstack([self._tail, *new_vectors])
+
+    def _segment_width(self) -> int:
+        """Vector width of the first readable listed segment, or the configured dimension."""
+        for seg in self._read_manifest()["segments"]:
+            try:
+                vectors = np.load(str(self._segment_path(seg["id"])), mmap_mode='r')
+            except (OSError, ValueError):
+                continue
+            if vectors.ndim == 2:
+                return vectors.shape[1]
+        return self.dimension
+
+    def _segment_path(self, segment_id: int) -> Path:
+        return self.index_dir / f"{self._generation_prefix(self.generation)}_seg{segment_id:06d}.npy"
+
+    def _current_base_version(self) -> Optional[Tuple[int, int]]:
+        return _file_version(self.index_path)
+
+    def disk_version(self) -> Tuple:
+        """(mtime_ns, size) of the base, manifest and generation pointer; changes whenever the store is written."""
+        return (self._current_base_version(), _file_version(self.manifest_path), _file_version(self.generation_path))
+
+    def is_stale(self) -> bool:
+        """True if the files on disk were written (e.g. by another worker) since we loaded them."""
+        return self.disk_version() != (self._base_version, self._manifest_version, self._generation_version)
+
+    def refresh(self) -> None:
+        """
+        Bring the in-memory view up to date with disk.
+        Appends by other workers only load their new segments; a rewritten base reloads fully.
+        """
+        with self._lock:
+            swapped = _file_version(self.generation_path) != self._generation_version
+            if self._pinned_generation is None and swapped:
+                # A rebuild switched generations
+                self._load_or_create()
+            elif self._current_base_version() != self._base_version:
+                self._load_or_create()
+            elif _file_version(self.manifest_path) != self._manifest_version:
+                self._load_new_segments()
+
+    # ------------------------------------------------------------------ consistency
+
+    def verify(self) -> Dict:
+        """
+        Compare the loaded vector rows with the manifest, metadata and lexical row counts.
+
+        A crash can leave metadata or lexical rows past the vector count (an add
+        that never published its segment) or a manifest promising rows whose
+        segment file is gone. Read-only; see repair().
+        """
+        with self._lock:
+            rows = self.count
+            metadata_rows = self._meta.row_count(rows)
+            stored_metadata_rows = self._meta.stored_rows()
+            lexical_rows = self._lexical.indexed_rows()
+            return {
+                "rows": rows,
+                "manifest_rows": self._manifest_rows,
+                "metadata_rows": metadata_rows,
+                "orphan_metadata_rows": max(stored_metadata_rows - rows, 0),
+                "orphan_lexical_rows": max(lexical_rows - rows, 0),
+                "ok": (
+                    self._manifest_rows in (None, rows)
+                    and metadata_rows == rows
+                    and stored_metadata_rows <= rows
+                    and lexical_rows <= rows
+                ),
+            }
+
+    def repair(self) -> Dict:
+        """
+        Drop what a crashed writer can leave behind, under the write lock. Returns the
+        verify() report taken before repairing.
+
+        An add that died before publishing its segment leaves metadata and lexical
+        rows past the manifest's row count; those are deleted. Nothing the manifest
+        publishes is ever deleted: a listed segment that exists but fails to load
+        (a transient read error, a shape mismatch) is logged and the rows before it
+        are served, while a missing segment or metadata gap raises
+        StoreDataMissingError, since only a re-ingest can restore those rows.
+        """
+        with self._write_lock():
+            self._repairing = True
+            try:
+                # A writer may have been mid-add when the report that triggered this was taken
+                self.refresh()
+                self._load_new_segments()  # Retry segments that failed to load transiently
+                report = self.verify()
+                if report["ok"]:
+                    return report
+
+                unloaded = self._unloaded_segment_paths()
+                missing = [path for path in unloaded if not path.exists()]
+                if missing:
+                    raise StoreDataMissingError(
+                        f"Vector store {self.name} (tenant {self.tenant_id}) lists missing segments: "
+                        f"{', '.join(path.name for path in missing)}"
+                    )
+                if report["metadata_rows"] < self.count:
+                    raise StoreDataMissingError(
+                        f"Vector store {self.name} (tenant {self.tenant_id}) has no metadata "
+                        f"for row {self._meta.first_missing_row(self.count)}"
+                    )
+
+                published = self._manifest_rows if self._manifest_rows is not None else self.count
+                if self._meta.stored_rows() > published or self._lexical.indexed_rows() > published:
+                    logger.warning(
+                        "Repairing vector store %s (tenant %s): %s; dropping rows past %d",
+                        self.name, self.tenant_id, report, published,
+                    )
+                    self._meta.truncate(published)
+                    self._lexical.truncate(published)
+                if unloaded:
+                    logger.error(
+                        "Vector store %s (tenant %s) could not load %s; serving %d of %d rows",
+                        self.name, self.tenant_id, ", ".join(path.name for path in unloaded),
+                        self.count, published,
+                    )
+                return report
+            finally:
+                self._repairing = False
+
+    def _unloaded_segment_paths(self) -> List[Path]:
+        """Files of manifest segments holding rows that aren't loaded. Caller holds the lock."""
+        loaded_ids = {seg["id"] for seg in self._segments}
+        base_rows = self._base.shape[0]
+        return [
+            self._segment_path(seg["id"])
+            for seg in self._read_manifest()["segments"]
+            if seg["id"] not in loaded_ids and seg["start"] + seg["rows"] > base_rows
+        ]
+
+    def _require_complete(self) -> None:
+        """
+        Refuse to publish a manifest while listed segments are unloaded, since it would
+        drop them. Retries loading them first. Caller holds the write lock.
+        """
+        if self._manifest_rows is None or self.count >= self._manifest_rows:
+            return
+        self._load_new_segments()
+        if self.count < self._manifest_rows:
+            raise OSError(
+                f"Vector store {self.name} (tenant {self.tenant_id}) has only {self.count} of "
+                f"{self._manifest_rows} rows loaded; not writing until its segments load"
+            )
 
-        # Store metadata
+    # ------------------------------------------------------------------ writing
+
+    def add(self, texts: List[str], metadata_list: List[Dict] = None, embeddings: Optional[np.ndarray] = None):
+        """
+        Add texts with optional metadata. Writes one small segment, not the whole index.
+        `embeddings` (one row per text, e.g. vectors reused from another generation) skips embedding.
+        """
+        if not texts:
+            return
+
+        if embeddings is None:
+            embeddings = embed_texts(texts, dimensions=self.dimension)
+        new_embeddings = self._fit_dimension(np.array(embeddings, dtype=np.float32))
+        new_metadata = []
         for i, text in enumerate(texts):
             meta = metadata_list[i] if metadata_list and i < len(metadata_list) else {}
-            self.metadata.append({
+            new_metadata.append({
                 "content": text,
                 **meta
             })
 
-        self._save()
+        with self._write_lock():
+            # Pick up segments other workers appended so our row offsets stay correct
+            self.refresh()
+            self._require_complete()
 
-    def search(self, query: str, top_k: int = 5, score_threshold: float = 0.0) -> List[Tuple[Dict, float]]:
-        """Search for similar texts using cosine similarity. Returns list of (metadata, score) tuples."""
-        if self.embeddings.shape[0] == 0:
-            return []
+            # Metadata rows first: rows past the vector count are ignored until the
+            # manifest below makes them visible, so a crash here leaves no half-added chunk
+            segment = {"id": self._next_segment, "start": self.count, "rows": len(new_metadata)}
+            self._meta.put(segment["start"], new_metadata)
+            self._lexical.put(segment["start"], texts)
+            _atomic_write(self._segment_path(segment["id"]), lambda f: np.save(f, new_embeddings))
+
+            self._next_segment += 1
+            self._write_manifest(self._segments + [segment], self.count + segment["rows"])
 
-        query_embedding = embed_query(query).astype(np.float32)
+            self._tail = np.vstack([self._tail, new_embeddings])
+            self._segments.append(segment)
 
-        # Normalize for cosine similarity
-        query_norm = query_embedding / (np.linalg.norm(query_embedding) + 1e-9)
-        embed_norms = self.embeddings / (np.linalg.norm(self.embeddings, axis=1, keepdims=True) + 1e-9)
+            if self._needs_compaction():
+                self._schedule_compaction()
 
-        # Cosine similarity (dot product of normalized vectors)
-        scores = np.dot(embed_norms, query_norm)
+    def _fit_dimension(self, embeddings: np.ndarray) -> np.ndarray:
+        """Unit-normalize embeddings at this store's dimension (cutting longer ones down)."""
+        if embeddings.shape[-1] > self.dimension:
+            return truncate_embeddings(embeddings, self.dimension)
+        if embeddings.ndim == 1:
+            return embeddings / (np.linalg.norm(embeddings) + 1e-9)
+        return _normalize_rows(embeddings)
 
-        # Get top-k indices
-        top_k = min(top_k, len(scores))
-        top_indices = np.argsort(scores)[::-1][:top_k]
+    def _write_manifest(self, segments: List[Dict], rows: int) -> None:
+        """Publish `segments` on top of the base file; `rows` is the resulting total. Caller holds the write lock."""
+        self.version += 1
+        _write_json(
+            self.manifest_path,
+            {"segments": segments, "next_segment": self._next_segment, "rows": rows, "version": self.version},
+        )
+        self._manifest_version = _file_version(self.manifest_path)
+        self._manifest_rows = rows
 
-        results = []
-        for idx in top_indices:
-            score = float(scores[idx])
-            if score >= score_threshold:
-                results.append((self.metadata[idx], score))
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """
+        Hold the in-process lock and the cross-process file lock for a mutation.
+        A rebuild's shadow is private until swapped in, so it skips the file lock.
+        """
+        with self._lock, (self._file_lock if self._pinned_generation is None else nullcontext()):
+            yield
 
-        return results
+    def _write_base(self, embeddings: np.ndarray) -> None:
+        """Atomically replace the compacted base matrix."""
+        _atomic_write(self.index_path, lambda f: np.save(f, embeddings))
+        self._base_version = self._current_base_version()
+
+    def _needs_compaction(self) -> bool:
+        tail_rows = self._tail.shape[0]
+        threshold = max(self.COMPACT_MIN_ROWS, int(self._base.shape[0] * self.COMPACT_RATIO))
+        return len(self._segments) >= self.MAX_SEGMENTS or tail_rows >= threshold
+
+    def _schedule_compaction(self) -> None:
+        if self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            logger.exception("Compaction of vector store %s (tenant %s) failed", self.name, self.tenant_id)
+        finally:
+            self._compacting = False
+
+    def compact(self) -> None:
+        """Fold all current segments into the base files and delete them."""
+        with self._lock:
+            if not self._segments:
+                return
+            epoch = self._epoch
+            compacted = list(self._segments)
+            compacted_paths = [self._segment_path(seg["id"]) for seg in compacted]
+            compacted_rows = sum(seg["rows"] for seg in compacted)
+            index_path = self.index_path
+            merged = np.vstack([self._base, self._tail[:compacted_rows]])
+
+        # The expensive full write goes to a temp file outside the lock so searches and
+        # adds aren't blocked; only the rename happens under it. Metadata is row-keyed
+        # in the sidecar already, so only vectors are rewritten.
+        index_tmp = _write_temp(index_path, lambda f: np.save(f, merged))
+        pending_compact = self._write_compact_temp(merged)
+
+        with self._write_lock():
+            # Catch up with other workers first: a base they rewrote (their own compaction,
+            # a rebuild) reloads and bumps the epoch, and their new segments are kept below
+            self.refresh()
+            compacted_ids = {seg["id"] for seg in compacted}
+            # Cleared or reloaded meanwhile (the merged snapshot is obsolete), or another
+            # compaction in this process folded the same segments first
+            if epoch != self._epoch or not compacted_ids <= {seg["id"] for seg in self._segments}:
+                index_tmp.unlink(missing_ok=True)
+                self._discard_compact_temp(pending_compact)
+                return
+            try:
+                self._require_complete()
+            except OSError:
+                index_tmp.unlink(missing_ok=True)
+                self._discard_compact_temp(pending_compact)
+                raise
+            # Loaders skip segments whose rows the (larger) base already covers, so a crash
+            # between this rename and the manifest write never duplicates rows.
+            _replace(index_tmp, self.index_path)
+            self._segments = [seg for seg in self._segments if seg["id"] not in compacted_ids]
+            self._write_manifest(self._segments, self.count)
+            self._base = self._load_embeddings() if self._map_base else merged
+            self._tail = self._tail[compacted_rows:]
+            self._base_version = self._current_base_version()
+            self._attach_compact(pending_compact)
+            self._sync_ann()
+
+        for path in compacted_paths:
+            path.unlink(missing_ok=True)
 
     def _save(self):
-        """Persist embeddings and metadata to disk."""
-        np.save(str(self.index_path), self.embeddings)
-        with open(self.metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+        """Persist the whole index as a fresh base with no segments."""
+        with self._lock:
+            epoch, embeddings = self._epoch, self.embeddings
+        # Quantizing the compact copy is the slow part; do it before taking the lock
+        pending_compact = self._write_compact_temp(embeddings)
+
+        with self._write_lock():
+            if epoch != self._epoch or self.count != embeddings.shape[0]:
+                # Written meanwhile; save what is there now and convert under the lock
+                self._discard_compact_temp(pending_compact)
+                embeddings = self.embeddings
+                pending_compact = None
+            self._epoch += 1
+            stale_segments = [self._segment_path(seg["id"]) for seg in self._segments]
+            self._write_base(embeddings)
+            self._segments = []
+            self._write_manifest([], embeddings.shape[0])
+            # Drop the private in-memory copy in favour of the shared mapping
+            self._base = self._load_embeddings() if self._map_base else embeddings
+            self._tail = np.zeros((0, embeddings.shape[1]), dtype=np.float32)
+            if pending_compact is not None:
+                self._attach_compact(pending_compact)
+            else:
+                self._sync_compact()
+            self._sync_ann()
+
+        for path in stale_segments:
+            path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------ compact storage
+
+    def _sync_compact(self) -> None:
+        """Attach the compact copy of the current base, converting it from float32 if needed. Caller holds the lock."""
+        self._compact = None
+        if self.storage == "float32" or self._base.shape[0] == 0:
+            return
+        fingerprint = matrix_fingerprint(self._base)
+        try:
+            compact = load_quantized(
+                self.compact_path, self.compact_info_path, self.storage, fingerprint, self.mmap
+            )
+        except Exception:
+            logger.exception("Could not load compact embeddings %s; converting", self.compact_path)
+            compact = None
+        if compact is None:
+            compact = quantize(self._base, self.storage)
+            save_quantized(compact, self.compact_path, self.compact_info_path, fingerprint)
+            if self.mmap:
+                compact = load_quantized(
+                    self.compact_path, self.compact_info_path, self.storage, fingerprint, mmap=True
+                )
+        self._compact = compact
+
+    def _write_compact_temp(self, base: np.ndarray) -> Optional[Tuple[QuantizedMatrix, Path, Path]]:
+        """
+        Quantize `base` into temp files beside the compact copy, without holding the lock.
+        Returns None when the store keeps no compact copy.
+        """
+        if self.storage == "float32" or base.shape[0] == 0:
+            return None
+        compact = quantize(base, self.storage)
+        codes_tmp = _write_temp(self.compact_path, lambda f: np.save(f, compact.codes))
+        header = quantized_header(compact, matrix_fingerprint(base))
+        info_tmp = _write_temp(self.compact_info_path, lambda f: f.write(header))
+        return compact, codes_tmp, info_tmp
+
+    @staticmethod
+    def _discard_compact_temp(pending: Optional[Tuple[QuantizedMatrix, Path, Path]]) -> None:
+        if pending is not None:
+            for path in pending[1:]:
+                path.unlink(missing_ok=True)
+
+    def _attach_compact(self, pending: Optional[Tuple[QuantizedMatrix, Path, Path]]) -> None:
+        """Rename a copy from _write_compact_temp (built from the current base) into place. Caller holds the write lock."""
+        if pending is None:
+            self._compact = None
+            return
+        compact, codes_tmp, info_tmp = pending
+        _replace(codes_tmp, self.compact_path)
+        _replace(info_tmp, self.compact_info_path)
+        if self.mmap:
+            compact = load_quantized(
+                self.compact_path, self.compact_info_path, self.storage, matrix_fingerprint(self._base), mmap=True
+            )
+        self._compact = compact
+
+    # ------------------------------------------------------------------ ANN
+
+    def _sync_ann(self) -> None:
+        """Attach the persisted ANN index if it matches the current base, else rebuild it. Caller holds the lock."""
+        self._ann = None
+        if not self.ann_min_rows or self._base.shape[0] < self.ann_min_rows:
+            return
+        backend = get_ann_backend(self.ann_backend)
+        try:
+            index = backend.load(self.ann_path, **self.ann_params)
+        except Exception:
+            logger.exception("Could not load ANN index %s; rebuilding", self.ann_path)
+            index = None
+        if index is not None and index.fingerprint == matrix_fingerprint(self._base):
+            self._ann = index
+        else:
+            self._schedule_ann_build()
+
+    def _schedule_ann_build(self) -> None:
+        if self._ann_building:
+            return
+        self._ann_building = True
+        threading.Thread(target=self._build_ann_in_background, daemon=True).start()
+
+    def _build_ann_in_background(self) -> None:
+        stale = False
+        try:
+            with self._lock:
+                epoch, base = self._epoch, self._base
+            index = get_ann_backend(self.ann_backend)(**self.ann_params)
+            index.build(base)
+            index_tmp = _write_temp(self.ann_path, index.save)
+            with self._lock:
+                if epoch != self._epoch or base is not self._base:
+                    # Base replaced while training; its own build request was skipped
+                    # while this one ran, so start over on the new base below
+                    index_tmp.unlink(missing_ok=True)
+                    stale = True
+                    return
+                _replace(index_tmp, self.ann_path)
+                self._ann = index
+        except Exception:
+            logger.exception("ANN build for vector store %s (tenant %s) failed", self.name, self.tenant_id)
+        finally:
+            with self._lock:
+                self._ann_building = False
+                if stale:
+                    self._sync_ann()
 
     def clear(self):
         """Clear all data from the index."""
-        self.embeddings = np.zeros((0, self.dimension), dtype=np.float32)
-        self.metadata = []
-        self._save()
+        with self._write_lock():
+            self.dimension = self.configured_dimension
+            self._base = np.zeros((0, self.dimension), dtype=np.float32)
+            self._tail = np.zeros((0, self.dimension), dtype=np.float32)
+            self._meta.clear()
+            self._lexical.clear()
+            self._save()
 
-    @property
-    def count(self) -> int:
-        return self.embeddings.shape[0]
+    @contextmanager
+    def rebuild(self, expected_version: Optional[int] = None) -> Iterator["FAISSStore"]:
+        """
+        Replace the whole index without an empty window:
+
+            with store.rebuild() as shadow:
+                shadow.add(texts, metadata)
+
+        `shadow` is an empty store writing the next generation's files. When the
+        block completes it is saved and the generation pointer is switched to it
+        (one atomic rename); this store reloads, and other workers follow via
+        is_stale. If the block raises, the shadow files are deleted and the live
+        generation is untouched.
+
+        With `expected_version` (the `version` the shadow's contents were derived
+        from), the swap is refused with StoreChangedError if any write landed
+        in between, so a read-modify-rebuild never overwrites a newer index.
+        """
+        with self._write_lock():
+            # Past every generation on disk, including leftovers of crashed or concurrent rebuilds;
+            # the shadow's sidecar is created before the lock is released, claiming the number
+            generation = max(self._generations_on_disk() | {self.generation}) + 1
+            shadow = FAISSStore(
+                self.name,
+                tenant_id=self.tenant_id,
+                mmap=self.mmap,
+                ann_backend=self.ann_backend,
+                ann_min_rows=0,  # The live store builds its ANN index after the swap
+                ann_params=self.ann_params,
+                storage=self.storage,
+                rescore_factor=self.rescore_factor,
+                dimension=self.configured_dimension,
+                generation=generation,
+            )
+        try:
+            yield shadow
+            shadow._save()  # One base file (and compact copy), no segments
+        except BaseException:
+            shadow.close()
+            for path in self._generation_files(generation):
+                path.unlink(missing_ok=True)
+            raise
+
+        with self._write_lock():
+            # Versions keep increasing across generations, so version-keyed caches can't collide
+            self.refresh()
+            if expected_version is not None and self.version != expected_version:
+                shadow.close()
+                for path in self._generation_files(generation):
+                    path.unlink(missing_ok=True)
+                raise StoreChangedError(
+                    f"Vector store {self.name} (tenant {self.tenant_id}) changed during rebuild: "
+                    f"version {expected_version} -> {self.version}"
+                )
+            replaced = self.generation
+            if shadow.version <= self.version:
+                shadow.version = self.version
+                shadow._write_manifest([], shadow.count)
+            shadow.close()
+            _write_json(self.generation_path, {"generation": generation})
+            self._load_or_create()
+
+            # Keep the generation just replaced for workers that haven't reloaded yet; drop older
+            # ones (newer ones may belong to a rebuild still in progress elsewhere)
+            for old in self._generations_on_disk():
+                if old < replaced and old != generation:
+                    for path in self._generation_files(old):
+                        path.unlink(missing_ok=True)
+
+    def rebuild_from(self, load: Callable[[], Tuple[List[str], List[Dict]]]) -> int:
+        """
+        Rebuild from the (texts, metadata) `load()` returns, e.g. read from the database.
+
+        An add landing between `load()` and the swap would be dropped with the old
+        generation, so the swap is refused and the rebuild redone from a fresh
+        `load()`, up to REBUILD_ATTEMPTS times. Returns the number of rows written.
+        """
+        for attempt in range(self.REBUILD_ATTEMPTS):
+            self.refresh()
+            version = self.version
+            texts, metadata_list = load()
+            try:
+                with self.rebuild(expected_version=version) as shadow:
+                    shadow.add(texts, metadata_list)
+                return len(texts)
+            except StoreChangedError:
+                if attempt == self.REBUILD_ATTEMPTS - 1:
+                    raise
+                logger.info("Vector store %s (tenant %s) written during rebuild; retrying", self.name, self.tenant_id)
+
+    def close(self) -> None:
+        """Close the SQLite connections; the store must not be used afterwards."""
+        with self._lock:
+            self._meta.close()
+            self._lexical.close()
+
+    # ------------------------------------------------------------------ search
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        score_threshold: float = 0.0,
+        exact: bool = False,
+        query_embedding: Optional[np.ndarray] = None,
+        mode: str = "vector",
+        return_embeddings: bool = False,
+    ) -> List[Tuple]:
+        """
+        Search for similar texts using cosine similarity. Returns list of (metadata, score) tuples.
+        Uses the ANN index when one is ready unless exact=True.
+
+        Pass `query_embedding` (e.g. the full-size vector from embed_query) to search
+        several stores with one embedding call; it is cut to this store's dimension.
+
+        mode="hybrid" ranks by reciprocal rank fusion of the vector and BM25 rankings
+        but still reports cosine scores; mode="lexical" ranks by BM25 alone, reported
+        squashed into [0, 1) (see lexical_similarity), and never embeds the query.
+
+        With return_embeddings=True each hit is (metadata, score, stored unit vector),
+        so callers can rescore or diversify results without re-embedding them.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Available: {SEARCH_MODES}")
+        with self._lock:
+            base, tail, ann, compact = self._base, self._tail, self._ann, self._compact
+            meta, lexical = self._meta, self._lexical
+        count = base.shape[0] + tail.shape[0]
+        if count == 0:
+            return []
+
+        if mode == "lexical":
+            top_rows, bm25 = lexical.search(query, top_k, count)
+            top_scores = lexical_similarity(bm25)
+            keep = top_scores >= score_threshold
+            top_rows, top_scores = top_rows[keep], top_scores[keep]
+            return self._hits(meta, base, tail, top_rows, top_scores, return_embeddings)
 
+        if query_embedding is None:
+            query_embedding = embed_query(query, dimensions=self.dimension)
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
 
-# Global index singletons
-_global_kb_store: Optional[FAISSStore] = None
+        # Stored embeddings are already unit-length; only the query needs normalizing
+        query_norm = self._fit_dimension(query_embedding)
 
+        if mode == "vector":
+            top_rows, top_scores = self._vector_search(
+                base, tail, ann, compact, query_norm, top_k, score_threshold, exact
+            )
+            return self._hits(meta, base, tail, top_rows, top_scores, return_embeddings)
 
-def get_global_kb_store() -> FAISSStore:
-    global _global_kb_store
-    if _global_kb_store is None:
-        _global_kb_store = FAISSStore("global_kb")
-    return _global_kb_store
+        depth = top_k * self.HYBRID_DEPTH
+        vector_rows, _ = self._vector_search(base, tail, ann, compact, query_norm, depth, None, exact)
+        lexical_rows, _ = lexical.search(query, depth, count)
+        fused_rows, _ = reciprocal_rank_fusion([vector_rows, lexical_rows])
+        top_rows = fused_rows[:top_k]
+        # Exact cosine of the fused hits, so scores stay comparable with vector mode
+        top_scores = _gather_rows(base, tail, top_rows) @ query_norm
+        keep = top_scores >= score_threshold
+        return self._hits(meta, base, tail, top_rows[keep], top_scores[keep], return_embeddings)
 
+    def _vector_search(
+        self, base, tail, ann, compact, query_norm: np.ndarray, top_k: int,
+        score_threshold: Optional[float], exact: bool,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Cosine top_k over a (base, tail, ann, compact) snapshot: (rows, scores), best first."""
+        # First pass over the compact copy when there is one; its candidates are rescored below
+        scan = compact if compact is not None else base
+        rescore = compact is not None and self.rescore_factor > 0
+        n_candidates = top_k * self.rescore_factor if rescore else top_k
 
-def get_tenant_store(tenant_id: int, store_type: str) -> FAISSStore:
-    """Get tenant-specific store. store_type: 'kb', 'examples', 'corrections'"""
-    return FAISSStore(f"tenant_{store_type}", tenant_id=tenant_id)
+        # Cosine similarity (dot product of normalized vectors), over ANN candidates when available
+        if ann is not None and not exact:
+            rows, scores = ann.search(scan, query_norm, n_candidates)
+        else:
+            rows, scores = None, scan @ query_norm
+        if tail.shape[0]:
+            scores = np.concatenate([scores, tail @ query_norm])
+            if rows is not None:
+                rows = np.concatenate([rows, np.arange(base.shape[0], base.shape[0] + tail.shape[0])])
+
+        if rescore:
+            candidates = top_k_indices(scores, n_candidates)
+            candidate_rows = candidates if rows is None else rows[candidates]
+            # Segment rows were scored in float32 already; base rows are re-read from the float32 file
+            exact_scores = scores[candidates]
+            in_base = candidate_rows < base.shape[0]
+            exact_scores[in_base] = base[candidate_rows[in_base]] @ query_norm
+            selected = top_k_indices(exact_scores, top_k, score_threshold)
+            return candidate_rows[selected], exact_scores[selected]
+
+        selected = top_k_indices(scores, top_k, score_threshold)
+        top_rows = selected if rows is None else rows[selected]
+        return top_rows, scores[selected]
+
+    @staticmethod
+    def _hits(meta, base, tail, rows: np.ndarray, scores: np.ndarray, return_embeddings: bool) -> List[Tuple]:
+        # Only the returned hits have their content materialized (from the same generation's sidecar)
+        metadata = meta.get(rows)
+        if not return_embeddings:
+            return [(meta, float(score)) for meta, score in zip(metadata, scores)]
+        vectors = _gather_rows(base, tail, rows)
+        return [(meta, float(score), vector) for meta, score, vector in zip(metadata, scores, vectors)]
+
+    def fetch(self, rows) -> Tuple[List[Dict], np.ndarray]:
+        """Full metadata (with content) and float32 unit vectors for the given rows, in order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            meta, base, tail = self._meta, self._base, self._tail
+        return meta.get(rows), _gather_rows(base, tail, rows)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Fixed metadata fields (source, type, ticket_id, article_id) as arrays aligned with rows."""
+        with self._lock:
+            count = self.count
+            if self._columns is None or self._columns[0] != count:
+                self._columns = (count, self._meta.columns(count))
+            return self._columns[1]
+
+    # ------------------------------------------------------------------ stats
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """All stored embeddings as one matrix (copies when segments are pending)."""
+        if self._tail.shape[0] == 0:
+            return self._base
+        return np.vstack([self._base, self._tail])
+
+    @property
+    def count(self) -> int:
+        return self._base.shape[0] + self._tail.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate private resident size of the in-memory embeddings and cached columns."""
+        base_bytes = 0 if isinstance(self._base, np.memmap) else int(self._base.nbytes)
+        compact_bytes = 0
+        if self._compact is not None and not isinstance(self._compact.codes, np.memmap):
+            compact_bytes = self._compact.nbytes
+        column_bytes = sum(col.nbytes for col in self._columns[1].values()) if self._columns else 0
+        return base_bytes + compact_bytes + int(self._tail.nbytes) + column_bytes
+
+    @property
+    def mapped_bytes(self) -> int:
+        """Bytes of embeddings served from the shared page cache rather than private memory."""
+        mapped = int(self._base.nbytes) if isinstance(self._base, np.memmap) else 0
+        if self._compact is not None and isinstance(self._compact.codes, np.memmap):
+            mapped += int(self._compact.codes.nbytes)
+        return mapped
@@ -0,0 +1,56 @@
+"""Cross-process advisory lock serializing the writers of a vector store."""
+
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, writers are only serialized within the process
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive `flock` on a lock file, reentrant within the holding thread.
+
+    flock locks belong to an open file description, so taking the lock again
+    through a second descriptor would block on ourselves; nested acquisitions
+    are counted instead and only the outermost one touches the file. The lock
+    file itself is never deleted, since unlinking it would let two processes
+    lock different inodes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self) -> None:
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                self._lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
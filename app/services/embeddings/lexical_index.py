@@ -0,0 +1,140 @@
+"""BM25 inverted index over a vector store's chunks, kept in the store's SQLite sidecar."""
+
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.embeddings.similarity import top_k_indices
+
+# Words plus dotted/dashed compounds ("mail.example.com", "err_ssl_protocol_error", "php-fpm", "503")
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:[.\-][a-z0-9_]+)*")
+COMPOUND_SEPARATORS = re.compile(r"[.\-]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compounds are indexed whole and by their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if "." in token or "-" in token:
+            tokens.extend(part for part in COMPOUND_SEPARATORS.split(token) if part)
+    return tokens
+
+
+def lexical_similarity(bm25: np.ndarray, half_score: float = 5.0) -> np.ndarray:
+    """Squash unbounded BM25 scores into [0, 1) (half_score maps to 0.5) for code expecting cosine-like scores."""
+    return bm25 / (bm25 + half_score)
+
+
+class LexicalIndex:
+    """
+    Row-addressed BM25 postings (row N is chunk N of the store), built on `put`.
+
+    Like MetadataStore, rows at or beyond the store's vector count are ignored
+    at query time and rewritten on the next put, so the vector files remain
+    the source of truth for which chunks exist.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, row INTEGER NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, row)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS doc_lengths (row INTEGER PRIMARY KEY, length INTEGER NOT NULL)")
+        self._lengths: Optional[np.ndarray] = None  # Cached doc lengths for rows [0, len)
+
+    def put(self, start: int, texts: List[str]) -> None:
+        """Index texts as rows start, start+1, ... (dropping leftovers from those rows on)."""
+        postings, lengths = [], []
+        for offset, text in enumerate(texts):
+            terms = Counter(tokenize(text))
+            postings.extend((term, start + offset, tf) for term, tf in terms.items())
+            lengths.append((start + offset, sum(terms.values())))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            (indexed,) = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM doc_lengths").fetchone()
+            if indexed > start:
+                # Rows from an interrupted add or an earlier generation of the store
+                self._conn.execute("DELETE FROM postings WHERE row >= ?", (start,))
+                self._conn.execute("DELETE FROM doc_lengths WHERE row >= ?", (start,))
+            self._conn.executemany("INSERT OR REPLACE INTO postings (term, row, tf) VALUES (?, ?, ?)", postings)
+            self._conn.executemany("INSERT OR REPLACE INTO doc_lengths (row, length) VALUES (?, ?)", lengths)
+            self._conn.execute("COMMIT")
+            self._lengths = None
+
+    def indexed_rows(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM doc_lengths").fetchone()[0]
+
+    def search(self, query: str, top_k: int, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 top_k over rows [0, limit): (rows, scores), best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        with self._lock:
+            lengths = self._doc_lengths(limit)
+            fetched = [
+                self._conn.execute("SELECT row, tf FROM postings WHERE term = ? AND row < ?", (term, limit)).fetchall()
+                for term in terms
+            ]
+
+        avg_length = max(float(lengths.mean()), 1.0)
+        all_rows, all_scores = [], []
+        for postings in fetched:
+            if not postings:
+                continue
+            rows, tf = np.array(postings, dtype=np.int64).T
+            idf = math.log(1 + (limit - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.K1 * (1 - self.B + self.B * lengths[rows] / avg_length)
+            all_rows.append(rows)
+            all_scores.append(idf * tf * (self.K1 + 1) / (tf + norm))
+        if not all_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores)).astype(np.float32)
+        selected = top_k_indices(scores, top_k)
+        return rows[selected], scores[selected]
+
+    def _doc_lengths(self, limit: int) -> np.ndarray:
+        """Lengths for rows [0, limit) (0 where unindexed). Caller holds the lock."""
+        if self._lengths is None or self._lengths.shape[0] != limit:
+            lengths = np.zeros(limit, dtype=np.float32)
+            for row, length in self._conn.execute("SELECT row, length FROM doc_lengths WHERE row < ?", (limit,)):
+                lengths[row] = length
+            self._lengths = lengths
+        return self._lengths
+
+    def truncate(self, rows: int) -> None:
+        """Drop rows at or beyond `rows`."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM postings WHERE row >= ?", (rows,))
+            self._conn.execute("DELETE FROM doc_lengths WHERE row >= ?", (rows,))
+            self._conn.execute("COMMIT")
+            self._lengths = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM doc_lengths")
+            self._lengths = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
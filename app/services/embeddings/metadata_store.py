@@ -0,0 +1,134 @@
+"""SQLite sidecar holding per-chunk metadata for a vector store."""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+# Fields kept in their own columns (and exposed as columnar arrays); everything
+# else except `content` is packed into a compact JSON `extra` blob per row.
+TEXT_COLUMNS = ("source", "type")
+INT_COLUMNS = ("ticket_id", "article_id")
+COLUMNS = TEXT_COLUMNS + INT_COLUMNS
+
+
+class MetadataStore:
+    """
+    Row-addressed chunk metadata, where row N describes embedding N.
+
+    Only the small fixed fields are read in bulk; `content` and the extra
+    fields are fetched for the rows a search actually returns. Rows at or
+    beyond the vector count are ignored (and overwritten on the next add),
+    so the embedding files stay the source of truth for how many chunks exist.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Commits are durable before the vector store publishes the rows in its manifest
+        self._conn.execute("PRAGMA synchronous=FULL")
+        # Let worker processes share page-cache pages of the database too
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "row INTEGER PRIMARY KEY, source TEXT, type TEXT, ticket_id INTEGER, article_id INTEGER, "
+            "content TEXT NOT NULL, extra TEXT)"
+        )
+
+    def put(self, start: int, metadata_list: List[Dict]) -> None:
+        """Write metadata for rows start, start+1, ... (replacing any leftovers at those rows)."""
+        records = []
+        for offset, meta in enumerate(metadata_list):
+            extra = {k: v for k, v in meta.items() if k != "content" and k not in COLUMNS}
+            records.append((
+                start + offset,
+                *(meta.get(col) for col in COLUMNS),
+                meta.get("content", ""),
+                json.dumps(extra, ensure_ascii=False, separators=(",", ":")) if extra else None,
+            ))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (row, source, type, ticket_id, article_id, content, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._conn.execute("COMMIT")
+
+    def get(self, rows: Iterable[int]) -> List[Dict]:
+        """Materialize full metadata dicts (including content) for the given rows, in order."""
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            fetched = self._conn.execute(
+                f"SELECT row, content, source, type, ticket_id, article_id, extra FROM chunks "
+                f"WHERE row IN ({placeholders})",
+                rows,
+            ).fetchall()
+
+        by_row = {}
+        for row, content, *values, extra in fetched:
+            meta = {"content": content}
+            meta.update({col: value for col, value in zip(COLUMNS, values) if value is not None})
+            if extra:
+                meta.update(json.loads(extra))
+            by_row[row] = meta
+        return [by_row.get(r, {"content": ""}) for r in rows]
+
+    def columns(self, limit: int) -> Dict[str, np.ndarray]:
+        """Fixed fields for rows [0, limit) as arrays; missing ints are -1, missing text is None."""
+        with self._lock:
+            fetched = self._conn.execute(
+                "SELECT row, source, type, ticket_id, article_id FROM chunks WHERE row < ?",
+                (limit,),
+            ).fetchall()
+
+        result = {col: np.full(limit, None, dtype=object) for col in TEXT_COLUMNS}
+        result.update({col: np.full(limit, -1, dtype=np.int64) for col in INT_COLUMNS})
+        for row, *values in fetched:
+            for col, value in zip(COLUMNS, values):
+                if value is None or (col in INT_COLUMNS and not isinstance(value, int)):
+                    continue
+                result[col][row] = value
+        return result
+
+    def row_count(self, limit: int) -> int:
+        """Number of rows below `limit` that have metadata."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE row < ?", (limit,)).fetchone()[0]
+
+    def stored_rows(self) -> int:
+        """One past the highest row stored, including leftovers beyond the vector count."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+
+    def first_missing_row(self, limit: int) -> int:
+        """Lowest row below `limit` without metadata (`limit` if there is none)."""
+        with self._lock:
+            rows = np.array(
+                [r for (r,) in self._conn.execute("SELECT row FROM chunks WHERE row < ? ORDER BY row", (limit,))],
+                dtype=np.int64,
+            )
+        gaps = np.flatnonzero(rows != np.arange(rows.shape[0]))
+        return int(gaps[0]) if gaps.size else int(rows.shape[0])
+
+    def truncate(self, rows: int) -> None:
+        """Delete metadata for rows at or beyond `rows`."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE row >= ?", (rows,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
@@ -0,0 +1,122 @@
+"""Coalesces concurrent single-query embedding calls into batched API requests."""
+
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+EmbedBatch = Callable[[List[str], Optional[int]], np.ndarray]
+
+
+class QueryBatcher:
+    """
+    Micro-batching dispatcher for embed_query.
+
+    Callers (typically sync endpoints on the threadpool) enqueue a query and
+    block on a future. A collector thread takes the first waiting query, keeps
+    collecting for up to `window_ms` or `max_batch` queries, then sends them
+    as one request per requested dimension on a small pool (so collection
+    continues while requests are in flight) and fans the vectors back out.
+
+    The window only applies under concurrency: a query that finds the queue
+    empty and no request in flight is sent at once, so uncontended calls pay
+    no coalescing delay.
+    """
+
+    def __init__(self, embed_batch: EmbedBatch, window_ms: int = 10, max_batch: int = 64, max_in_flight: int = 4):
+        self.embed_batch = embed_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[str, Optional[int], Future]]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="embed-query")
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.queries = 0
+        self.batches = 0
+        self.requests = 0
+        self.max_batch_size = 0
+        self.max_queue_depth = 0
+        self.immediate = 0  # Batches sent without waiting out the window
+        self._in_flight = 0
+
+    def embed(self, text: str, dimensions: Optional[int] = None) -> np.ndarray:
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((text, dimensions, future))
+        with self._stats_lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future.result()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="embed-query-batcher", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            with self._stats_lock:
+                alone = self._in_flight == 0 and self._queue.empty()
+            deadline = time.monotonic() + (0 if alone else self.window)
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self._stats_lock:
+                self.queries += len(batch)
+                self.batches += 1
+                self.max_batch_size = max(self.max_batch_size, len(batch))
+                self.immediate += alone
+
+            by_dimension: Dict[Optional[int], List[Tuple[str, Future]]] = defaultdict(list)
+            for text, dimensions, future in batch:
+                by_dimension[dimensions].append((text, future))
+            with self._stats_lock:
+                self._in_flight += len(by_dimension)
+            for dimensions, items in by_dimension.items():
+                self._pool.submit(self._send, items, dimensions)
+
+    def _send(self, items: List[Tuple[str, Future]], dimensions: Optional[int]) -> None:
+        # Identical queries in one window share a single input
+        texts = list(dict.fromkeys(text for text, _ in items))
+        try:
+            vectors = self.embed_batch(texts, dimensions)
+        except Exception as exc:
+            for _, future in items:
+                future.set_exception(exc)
+            return
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+        with self._stats_lock:
+            self.requests += 1
+        # Copies, so a cached vector doesn't keep the whole batch array alive
+        by_text = {text: np.array(vector) for text, vector in zip(texts, vectors)}
+        for text, future in items:
+            future.set_result(by_text[text])
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "queries": self.queries,
+                "batches": self.batches,
+                "requests": self.requests,
+                "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "immediate_batches": self.immediate,
+                "in_flight": self._in_flight,
+            }
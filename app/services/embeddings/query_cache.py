@@ -0,0 +1,122 @@
+"""In-memory LRU cache of query embeddings."""
+
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.middleware.tenant import get_tenant_id
+
+
+def normalize_query(text: str) -> str:
+    """Cache key form of a query: Unicode-normalized, case-folded, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", text).split()).casefold()
+
+
+class QueryEmbeddingCache:
+    """
+    Per-process LRU of query vectors, bounded by entry count and bytes, with a TTL.
+
+    Cached vectors are read-only and shared between callers. Hits and misses
+    are counted per tenant (from the request's tenant context; None for
+    unauthenticated searches).
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 128 * 1024 * 1024, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._tenant_counts: Dict[Optional[int], Dict[str, int]] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            self._count(entry is not None)
+            return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, vector: np.ndarray) -> None:
+        vector.setflags(write=False)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._bytes += vector.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, vector = self._entries.pop(key)
+        self._bytes -= vector.nbytes
+
+    def _count(self, hit: bool) -> None:
+        counts = self._tenant_counts.setdefault(get_tenant_id(), {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = sum(c["hits"] for c in self._tenant_counts.values())
+            lookups = hits + sum(c["misses"] for c in self._tenant_counts.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": hits,
+                "misses": lookups - hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "by_tenant": {
+                    str(tenant) if tenant is not None else "anonymous": {
+                        **counts,
+                        "hit_rate": round(counts["hits"] / (counts["hits"] + counts["misses"]), 4),
+                    }
+                    for tenant, counts in self._tenant_counts.items()
+                },
+            }
+
+
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Optional[QueryEmbeddingCache]:
+    """Process-wide query cache from settings, or None when disabled."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                if not settings.query_cache_max_entries:
+                    return None
+                _cache = QueryEmbeddingCache(
+                    max_entries=settings.query_cache_max_entries,
+                    max_bytes=settings.query_cache_max_mb * 1024 * 1024,
+                    ttl_seconds=settings.query_cache_ttl_seconds,
+                )
+    return _cache
+
+
+def get_query_cache_stats() -> Dict:
+    cache = get_query_cache()
+    return cache.stats() if cache else {"enabled": False}
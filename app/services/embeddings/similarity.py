@@ -0,0 +1,95 @@
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, top_k: int, score_threshold: float = None) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first, keeping only scores >= score_threshold.
+
+    Uses np.argpartition to select candidates in O(N) and only sorts those
+    k candidates, instead of fully sorting every score. The top-k above a
+    threshold are exactly the overall top-k that pass it, so the threshold
+    is applied to the k candidates before their sort.
+    """
+    n = scores.shape[0]
+    top_k = min(top_k, n)
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if top_k < n:
+        candidates = np.argpartition(scores, n - top_k)[n - top_k:]
+    else:
+        candidates = np.arange(n)
+
+    if score_threshold is not None:
+        candidates = candidates[scores[candidates] >= score_threshold]
+
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+# Rank offset from the original RRF paper (Cormack et al., 2009); damps the weight of the very top ranks
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K):
+    """
+    Fuse ranked lists of row ids: each row scores sum(1 / (k + rank)) over the lists it appears in.
+
+    Only ranks are used, so lists scored on incomparable scales (cosine, BM25)
+    combine without calibration. Returns (rows, fused scores), best first.
+    """
+    rankings = [np.asarray(r, dtype=np.int64) for r in rankings]
+    rows = np.concatenate(rankings)
+    if rows.shape[0] == 0:
+        return rows, np.empty(0, dtype=np.float64)
+    contributions = np.concatenate([1.0 / (k + np.arange(1, r.shape[0] + 1)) for r in rankings])
+    unique, inverse = np.unique(rows, return_inverse=True)
+    fused = np.bincount(inverse, weights=contributions)
+    order = np.argsort(-fused, kind="stable")
+    return unique[order], fused[order]
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    top_k: int,
+    lambda_mult: float = 0.7,
+    groups: np.ndarray = None,
+    max_per_group: int = None,
+    max_similarity: float = None,
+) -> np.ndarray:
+    """
+    Maximal Marginal Relevance: indices picked greedily by
+    lambda_mult * relevance - (1 - lambda_mult) * (max cosine to anything already picked).
+
+    `vectors` are unit rows, so the pairwise similarities are one matrix
+    product and each step is a vectorized update. At most `max_per_group`
+    picks share a `groups` label, and candidates at or above `max_similarity`
+    to a pick are dropped as duplicates (so fewer than top_k may come back).
+    """
+    n = relevance.shape[0]
+    top_k = min(top_k, n)
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarities = vectors @ vectors.T
+    max_sim = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    if groups is not None and max_per_group:
+        labels, group_ids = np.unique(groups, return_inverse=True)
+        group_counts = np.zeros(labels.shape[0], dtype=np.int64)
+
+    selected = []
+    while len(selected) < top_k and available.any():
+        gains = lambda_mult * relevance - (1 - lambda_mult) * max_sim
+        best = int(np.argmax(np.where(available, gains, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        max_sim = similarities[best] if len(selected) == 1 else np.maximum(max_sim, similarities[best])
+        if max_similarity is not None:
+            available &= max_sim < max_similarity
+        if groups is not None and max_per_group:
+            group_counts[group_ids[best]] += 1
+            if group_counts[group_ids[best]] >= max_per_group:
+                available &= group_ids != group_ids[best]
+    return np.array(selected, dtype=np.intp)
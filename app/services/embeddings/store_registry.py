@@ -0,0 +1,154 @@
+"""Process-wide LRU registry of loaded vector stores."""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import get_settings
+from app.services.embeddings.faiss_store import FAISSStore
+
+StoreKey = Tuple[Optional[int], str]
+
+
+class StoreRegistry:
+    """
+    Bounded LRU cache of FAISSStore instances keyed by (tenant_id, name).
+
+    A cached store is reused until its files on disk change (another worker
+    rebuilt or appended to it), in which case it is refreshed in place. Stores are
+    evicted least-recently-used first once either the entry limit or the
+    memory budget is exceeded. Memory-mapped embeddings live in the shared
+    page cache and don't count against the budget.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int = 2048 * 1024 * 1024,
+        store_options: Optional[Dict] = None,
+        dimensions: Optional[Dict[str, int]] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store_options = store_options or {}  # FAISSStore keyword arguments
+        self.dimensions = dimensions or {}  # Per-store embedding size, see dimension_for
+        self._stores: "OrderedDict[StoreKey, FAISSStore]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(self, name: str, tenant_id: Optional[int] = None) -> FAISSStore:
+        key = (tenant_id, name)
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+                stale = store.is_stale()
+                if stale:
+                    self.reloads += 1
+                else:
+                    self.hits += 1
+            else:
+                self.misses += 1
+
+        # Disk I/O happens outside the registry lock so one large index doesn't block other tenants
+        if store is not None:
+            if stale:
+                # Appends by other workers only load their new segments
+                store.refresh()
+            return store
+
+        store = FAISSStore(
+            name, tenant_id=tenant_id, dimension=self.dimension_for(name, tenant_id), **self.store_options
+        )
+
+        with self._lock:
+            self._stores[key] = store
+            self._stores.move_to_end(key)
+            self._evict(keep=key)
+        return store
+
+    def dimension_for(self, name: str, tenant_id: Optional[int] = None) -> Optional[int]:
+        """Configured embedding size: "{tenant_N|global}/{name}" overrides "{name}"; None = full size."""
+        scope = f"tenant_{tenant_id}" if tenant_id else "global"
+        return self.dimensions.get(f"{scope}/{name}") or self.dimensions.get(name)
+
+    def invalidate(self, name: str, tenant_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._stores.pop((tenant_id, name), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stores.clear()
+
+    def _evict(self, keep: StoreKey) -> None:
+        """Drop least-recently-used stores until within limits. Caller holds the lock."""
+        total_bytes = sum(s.nbytes for s in self._stores.values())
+        while len(self._stores) > 1 and (len(self._stores) > self.max_entries or total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._stores))
+            if oldest_key == keep:
+                break
+            total_bytes -= self._stores.pop(oldest_key).nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.reloads
+            return {
+                "entries": len(self._stores),
+                "max_entries": self.max_entries,
+                "resident_bytes": sum(s.nbytes for s in self._stores.values()),
+                "mapped_bytes": sum(s.mapped_bytes for s in self._stores.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_registry: Optional[StoreRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_store_registry() -> StoreRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                settings = get_settings()
+                _registry = StoreRegistry(
+                    max_entries=settings.vector_store_cache_max_entries,
+                    max_bytes=settings.vector_store_cache_max_mb * 1024 * 1024,
+                    store_options={
+                        "mmap": settings.vector_store_mmap,
+                        "ann_backend": settings.vector_store_ann_backend,
+                        "ann_min_rows": settings.vector_store_ann_min_rows,
+                        "ann_params": {
+                            "n_lists": settings.vector_store_ann_lists,
+                            "nprobe": settings.vector_store_ann_nprobe,
+                        },
+                        "storage": settings.vector_store_storage,
+                        "rescore_factor": settings.vector_store_rescore_factor,
+                    },
+                    dimensions=settings.vector_store_dimensions,
+                )
+    return _registry
+
+
+def get_global_kb_store() -> FAISSStore:
+    """Get the shared global KB store (reloaded automatically after a re-ingest)."""
+    return get_store_registry().get("global_kb")
+
+
+def get_tenant_store(tenant_id: int, store_type: str) -> FAISSStore:
+    """Get tenant-specific store. store_type: 'kb', 'examples', 'corrections'"""
+    return get_store_registry().get(f"tenant_{store_type}", tenant_id=tenant_id)
+
+
+def get_store_cache_stats() -> Dict:
+    """Hit/miss/eviction counters for the vector store registry."""
+    return get_store_registry().stats()
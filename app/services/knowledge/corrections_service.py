@@ -1,4 +1,5 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+import numpy as np
 from sqlalchemy.orm import Session
 
 from app.models import ApprovedReply, Ticket, AIReply
@@ -11,28 +12,25 @@ def index_corrections(db: Session, tenant_id: int) -> int:
     Stores: original AI reply, what was wrong, corrected response.
     """
     store = get_tenant_store(tenant_id, "corrections")
-    store.clear()
 
-    # Get approved replies marked as corrections (significant edits)
-    corrections = db.query(ApprovedReply, Ticket, AIReply).join(
-        Ticket, ApprovedReply.ticket_id == Ticket.id
-    ).outerjoin(
-        AIReply, ApprovedReply.ai_reply_id == AIReply.id
-    ).filter(
-        Ticket.tenant_id == tenant_id,
-        ApprovedReply.is_correction == True,
-        ApprovedReply.ai_reply_id.isnot(None)
-    ).all()
-
-    if not corrections:
-        return 0
-
-    texts = []
-    metadata_list = []
-
-    for approved, ticket, ai_reply in corrections:
-        # Format: What AI got wrong and how to fix it
-        correction_text = f"""Customer Issue: {ticket.subject}
+    def load_corrections():
+        # Get approved replies marked as corrections (significant edits)
+        corrections = db.query(ApprovedReply, Ticket, AIReply).join(
+            Ticket, ApprovedReply.ticket_id == Ticket.id
+        ).outerjoin(
+            AIReply, ApprovedReply.ai_reply_id == AIReply.id
+        ).filter(
+            Ticket.tenant_id == tenant_id,
+            ApprovedReply.is_correction == True,
+            ApprovedReply.ai_reply_id.isnot(None)
+        ).all()
+
+        texts = []
+        metadata_list = []
+
+        for approved, ticket, ai_reply in corrections:
+            # Format: What AI got wrong and how to fix it
+            correction_text = f"""Customer Issue: {ticket.subject}
 {ticket.content}
 
 INCORRECT Response (Do Not Use):
@@ -43,27 +41,37 @@ CORRECT Response:
 
 Edit Notes: {approved.edit_summary or 'Significant correction made'}"""
 
-        texts.append(correction_text)
-        metadata_list.append({
-            "source": f"correction_{approved.id}",
-            "ticket_id": ticket.id,
-            "ai_reply_id": ai_reply.id if ai_reply else None,
-            "subject": ticket.subject,
-            "edit_distance": approved.edit_distance,
-            "type": "correction"
-        })
-
-    store.add(texts, metadata_list)
-    return len(texts)
-
-
-def search_corrections(tenant_id: int, query: str, top_k: int = 3) -> List[Dict]:
+            texts.append(correction_text)
+            metadata_list.append({
+                "source": f"correction_{approved.id}",
+                "ticket_id": ticket.id,
+                "ai_reply_id": ai_reply.id if ai_reply else None,
+                "subject": ticket.subject,
+                "edit_distance": approved.edit_distance,
+                "type": "correction"
+            })
+        return texts, metadata_list
+
+    return store.rebuild_from(load_corrections)
+
+
+def search_corrections(
+    tenant_id: int,
+    query: str,
+    top_k: int = 3,
+    query_embedding: Optional[np.ndarray] = None,
+    mode: str = "vector",
+    return_embeddings: bool = False,
+) -> List[Dict]:
     """Search corrections to avoid past mistakes."""
     store = get_tenant_store(tenant_id, "corrections")
-    results = store.search(query, top_k=top_k)
+    results = store.search(
+        query, top_k=top_k, query_embedding=query_embedding, mode=mode, return_embeddings=return_embeddings
+    )
     return [{
         "content": r[0]["content"],
         "score": r[1],
+        **({"embedding": r[2]} if return_embeddings else {}),
         "source": r[0].get("source", ""),
         "ticket_id": r[0].get("ticket_id"),
         "type": "correction"
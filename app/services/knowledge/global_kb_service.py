@@ -1,52 +1,235 @@
+import hashlib
+import json
 import os
+import shutil
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
 
-from app.services.embeddings import chunk_markdown, chunk_text, get_global_kb_store
+import numpy as np
+
+from app.config import get_settings
+from app.services.embeddings import (
+    chunk_markdown, chunk_text, embed_texts, get_embedding_backend, get_global_kb_store,
+)
 
 KB_DIR = Path("data/kb/global")
+# Beside the global index: {"files": {relative path: {"hash", "chunks": [chunk content hashes]}}}
+INGEST_MANIFEST = "global_kb_ingest.json"
+# Directory of vectors embedded by an unfinished ingest
+INGEST_CHECKPOINT = "global_kb_ingest.checkpoint"
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 
+def _chunk_file(rel_path: Path, content: str) -> List[Dict]:
+    category = rel_path.parts[0] if len(rel_path.parts) > 1 else "general"
+    return chunk_markdown(content, metadata={
+        "source": str(rel_path),
+        "category": category,
+        "type": "global_kb"
+    })
+
+
+def _read_and_chunk(file_path: Path, known_hash: Optional[str]) -> Tuple[str, str, Optional[List[Dict]]]:
+    """
+    Worker-process step: read and hash one file, chunking it only if its hash
+    differs from `known_hash`. Returns (relative path, hash, chunks or None).
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    file_hash = _sha256(content)
+    rel_path = file_path.relative_to(KB_DIR)
+    return str(rel_path), file_hash, None if file_hash == known_hash else _chunk_file(rel_path, content)
+
+
+def _read_ingest_manifest(path: Path) -> Dict[str, Dict]:
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["files"]
+
+
+def _write_ingest_manifest(path: Path, files: Dict[str, Dict]) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"files": files}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class IngestCheckpoint:
+    """
+    Vectors embedded by an ingest that hasn't been swapped in yet, keyed by chunk hash.
 
-def ingest_global_kb():
+    Each embedded batch is saved as its own part file, so an interrupted
+    ingest re-run with the same model and dimension skips everything already
+    embedded. Cleared once the ingest completes.
+    """
+
+    def __init__(self, path: Path, model: str, dimension: int):
+        self.path = path
+        self.model = model
+        self.dimension = dimension
+        self.vectors: Dict[str, np.ndarray] = {}
+        self._parts = 0
+        for part in sorted(path.glob("*.npz")) if path.exists() else []:
+            self._parts += 1
+            with np.load(part) as data:
+                if str(data["model"]) == model and data["vectors"].shape[1:] == (dimension,):
+                    self.vectors.update(zip(data["hashes"].tolist(), data["vectors"]))
+
+    def save(self, hashes: List[str], vectors: np.ndarray) -> None:
+        self.vectors.update(zip(hashes, vectors))
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._parts += 1
+        part = self.path / f"{self._parts:06d}.npz"
+        tmp_path = part.with_name(f"{part.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, model=np.array(self.model), hashes=np.array(hashes), vectors=vectors)
+        os.replace(tmp_path, part)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.vectors = {}
+        self._parts = 0
+
+
+def _chunk_files(paths: List[Path], known_hashes: Dict[str, str], workers: int) -> Iterator[Tuple]:
+    """_read_and_chunk for every path, in a process pool when there are several; yields as each finishes."""
+    calls = [(path, known_hashes.get(str(path.relative_to(KB_DIR)))) for path in paths]
+    if workers <= 1 or len(paths) <= 1:
+        for call in calls:
+            yield _read_and_chunk(*call)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        for future in as_completed([pool.submit(_read_and_chunk, *call) for call in calls]):
+            yield future.result()
+
+
+def ingest_global_kb(full: bool = False):
     """
     Ingest all markdown files from data/kb/global into global FAISS index.
     Run once at setup or when KB is updated.
+
+    Incremental unless `full`: a manifest beside the index maps each file's
+    hash to its chunks' hashes. Unchanged files keep their stored rows,
+    changed files are re-chunked and only chunks with new text are embedded,
+    deleted files drop out, and the result is written once through a shadow
+    rebuild. Nothing is written if no file changed.
+
+    Files are read and chunked in a process pool (INGEST_WORKERS) while new
+    chunks are embedded in batches of INGEST_EMBED_BATCH_CHUNKS as they
+    arrive; embed_texts splits each batch into token-bounded requests sent
+    concurrently. Every batch is checkpointed, so a re-run after an
+    interruption only embeds what is left.
     """
+    settings = get_settings()
     store = get_global_kb_store()
-    store.clear()  # Fresh ingest
+    manifest_path = store.index_dir / INGEST_MANIFEST
+    previous = {} if full else _read_ingest_manifest(manifest_path)
+    dimension = store.configured_dimension
+    checkpoint = IngestCheckpoint(store.index_dir / INGEST_CHECKPOINT, get_embedding_backend().model, dimension)
+    if checkpoint.vectors:
+        print(f"Resuming from checkpoint: {len(checkpoint.vectors)} chunks already embedded")
+
+    rows_by_source = defaultdict(list)
+    if not full:
+        for row, source in enumerate(store.columns()["source"]):
+            rows_by_source[source].append(row)
+
+    paths = sorted(KB_DIR.glob("**/*.md"))
+    results = {}  # relative path -> (file hash, chunks, stored vectors by chunk hash)
+    pending: Dict[str, str] = {}  # chunk hash -> text, waiting for the next embedding batch
+    changed = False
+    embedded = 0
+
+    def embed_pending():
+        nonlocal embedded
+        hashes = list(pending)
+        checkpoint.save(hashes, embed_texts([pending[h] for h in hashes], dimensions=dimension))
+        embedded += len(hashes)
+        pending.clear()
+        print(f"Embedded {embedded} chunks ({len(results)}/{len(paths)} files chunked)")
+
+    known_hashes = {path: entry["hash"] for path, entry in previous.items()}
+    workers = settings.ingest_workers or os.cpu_count() or 1
+    for rel_path, file_hash, chunks in _chunk_files(paths, known_hashes, workers):
+        stored_metadata, stored_vectors = store.fetch(rows_by_source.get(rel_path, []))
+        stored_hashes = [_sha256(meta["content"]) for meta in stored_metadata]
+        # Vectors from an older, narrower configuration can't be reused
+        reusable = stored_vectors.shape[1] == dimension
+        by_hash = dict(zip(stored_hashes, stored_vectors)) if reusable else {}
 
-    total_chunks = 0
+        if chunks is None and reusable and previous[rel_path]["chunks"] == stored_hashes:
+            # Unchanged, and all of its chunks are in the store: keep the rows as they are
+            chunks = [{"content": meta.pop("content"), "metadata": meta} for meta in stored_metadata]
+        else:
+            changed = True
+            if chunks is None:
+                # Unchanged file whose rows went missing from the store
+                chunks = _chunk_file(Path(rel_path), (KB_DIR / rel_path).read_text(encoding='utf-8'))
+            new_chunks = 0
+            for chunk in chunks:
+                chunk_hash = _sha256(chunk["content"])
+                if chunk_hash not in by_hash and chunk_hash not in checkpoint.vectors and chunk_hash not in pending:
+                    pending[chunk_hash] = chunk["content"]
+                    new_chunks += 1
+            print(f"Ingested {rel_path}: {len(chunks)} chunks ({new_chunks} to embed)")
 
-    for file_path in KB_DIR.glob("**/*.md"):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        results[rel_path] = (file_hash, chunks, by_hash)
+        if len(pending) >= settings.ingest_embed_batch_chunks:
+            embed_pending()
+    if pending:
+        embed_pending()
 
-        # Get relative path for source tracking
-        rel_path = file_path.relative_to(KB_DIR)
-        category = rel_path.parts[0] if len(rel_path.parts) > 1 else "general"
+    texts, metadata, vectors, files = [], [], [], {}
+    for rel_path in sorted(results):
+        file_hash, chunks, by_hash = results[rel_path]
+        chunk_hashes = [_sha256(c["content"]) for c in chunks]
+        texts.extend(c["content"] for c in chunks)
+        metadata.extend(c["metadata"] for c in chunks)
+        vectors.extend(by_hash[h] if h in by_hash else checkpoint.vectors[h] for h in chunk_hashes)
+        files[rel_path] = {"hash": file_hash, "chunks": chunk_hashes}
 
-        chunks = chunk_markdown(content, metadata={
-            "source": str(rel_path),
-            "category": category,
-            "type": "global_kb"
-        })
+    # Files deleted since the last ingest (or rows the manifest doesn't know about)
+    changed = changed or set(previous) != set(files) or len(texts) != store.count
+    if not changed:
+        checkpoint.clear()
+        print(f"Global KB unchanged: {store.count} total chunks")
+        return store.count
 
-        if chunks:
-            texts = [c["content"] for c in chunks]
-            metadata = [c["metadata"] for c in chunks]
-            store.add(texts, metadata)
-            total_chunks += len(chunks)
-            print(f"Ingested {file_path.name}: {len(chunks)} chunks")
+    # Fresh index built aside and swapped in with a single bulk write
+    with store.rebuild() as shadow:
+        shadow.add(texts, metadata, embeddings=np.array(vectors) if vectors else None)
+    _write_ingest_manifest(manifest_path, files)
+    checkpoint.clear()
 
-    print(f"Global KB ingestion complete: {total_chunks} total chunks")
-    return total_chunks
+    print(
+        f"Global KB ingestion complete: {len(texts)} total chunks "
+        f"({embedded} embedded, {len(texts) - embedded} reused)"
+    )
+    return len(texts)
 
 
-def search_global_kb(query: str, top_k: int = 5) -> List[Dict]:
+def search_global_kb(
+    query: str,
+    top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    mode: str = "vector",
+    return_embeddings: bool = False,
+) -> List[Dict]:
     """Search global knowledge base."""
     store = get_global_kb_store()
-    results = store.search(query, top_k=top_k)
-    return [{"content": r[0]["content"], "score": r[1], **r[0]} for r in results]
+    results = store.search(
+        query, top_k=top_k, query_embedding=query_embedding, mode=mode, return_embeddings=return_embeddings
+    )
+    return [
+        {"content": r[0]["content"], "score": r[1], **r[0], **({"embedding": r[2]} if return_embeddings else {})}
+        for r in results
+    ]
 
 
 def get_global_kb_stats() -> Dict:
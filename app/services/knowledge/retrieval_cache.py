@@ -0,0 +1,107 @@
+"""In-memory LRU cache of retrieve_context results."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import get_settings
+from app.services.embeddings.query_cache import normalize_query
+
+
+def query_hash(query: str) -> str:
+    """Key form of a query: sha256 of its normalized text (see normalize_query)."""
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+
+class RetrievalCache:
+    """
+    Per-process LRU of retrieval results, bounded by entry count, with a TTL.
+
+    Keys include the version of every store that was searched (bumped on each
+    write, see FAISSStore.version), so an add, re-ingest or compaction by any
+    worker makes older entries unreachable; they age out through the LRU.
+    Values are stored and returned as given; callers copy what they mutate.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: int = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tenant_counts: Dict[int, Dict[str, int]] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, tenant_id: int, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            counts = self._tenant_counts.setdefault(tenant_id, {"hits": 0, "misses": 0})
+            counts["hits" if entry is not None else "misses"] += 1
+            return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = sum(c["hits"] for c in self._tenant_counts.values())
+            lookups = hits + sum(c["misses"] for c in self._tenant_counts.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": hits,
+                "misses": lookups - hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "by_tenant": {
+                    str(tenant): {
+                        **counts,
+                        "hit_rate": round(counts["hits"] / (counts["hits"] + counts["misses"]), 4),
+                    }
+                    for tenant, counts in self._tenant_counts.items()
+                },
+            }
+
+
+_cache: Optional[RetrievalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """Process-wide retrieval cache from settings, or None when disabled."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                if not settings.retrieval_cache_max_entries:
+                    return None
+                _cache = RetrievalCache(
+                    max_entries=settings.retrieval_cache_max_entries,
+                    ttl_seconds=settings.retrieval_cache_ttl_seconds,
+                )
+    return _cache
+
+
+def get_retrieval_cache_stats() -> Dict:
+    cache = get_retrieval_cache()
+    return cache.stats() if cache else {"enabled": False}
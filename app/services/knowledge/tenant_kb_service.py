@@ -1,9 +1,17 @@
+import logging
 from typing import List, Dict, Optional
+import numpy as np
 from sqlalchemy.orm import Session
 
+from app.db.session import SessionLocal
 from app.models.kb_article import KBArticle, KBCategory
 from app.schemas.kb import KBArticleCreate, KBArticleUpdate
-from app.services.embeddings import chunk_text, get_tenant_store
+from app.services.embeddings import StoreChangedError, chunk_text, embed_texts, get_tenant_store
+
+logger = logging.getLogger(__name__)
+
+# Incremental runs retried after losing a swap to a concurrent run
+INDEX_ATTEMPTS = 5
 
 
 def create_article(db: Session, tenant_id: int, data: KBArticleCreate) -> KBArticle:
@@ -55,54 +63,122 @@ def list_articles(db: Session, tenant_id: int, category: Optional[KBCategory] =
     return query.order_by(KBArticle.updated_at.desc()).all()
 
 
-def index_tenant_kb(db: Session, tenant_id: int) -> int:
+def _chunk_article(article: KBArticle) -> List[Dict]:
+    # Combine title and content for better context
+    full_text = f"# {article.title}\n\n{article.content}"
+    return chunk_text(full_text, metadata={
+        "source": f"kb_article_{article.id}",
+        "article_id": article.id,
+        "title": article.title,
+        "category": article.category.value,
+        "tags": article.tags,
+        "type": "tenant_kb"
+    })
+
+
+def index_tenant_kb(db: Session, tenant_id: int, incremental: bool = False) -> int:
     """
     Index all active KB articles for a tenant into FAISS.
     Returns number of chunks indexed.
-    """
-    store = get_tenant_store(tenant_id, "kb")
-    store.clear()  # Fresh index
-
-    articles = db.query(KBArticle).filter(
-        KBArticle.tenant_id == tenant_id,
-        KBArticle.is_active == True
-    ).all()
-
-    total_chunks = 0
 
-    for article in articles:
-        # Combine title and content for better context
-        full_text = f"# {article.title}\n\n{article.content}"
+    With `incremental`, only articles with is_indexed == False are chunked
+    and embedded (returning their chunk count); chunks of updated, deleted
+    or deactivated articles are dropped by article_id and all other chunks
+    keep their stored vectors. Nothing is written when no article changed.
 
-        chunks = chunk_text(full_text, metadata={
-            "source": f"kb_article_{article.id}",
-            "article_id": article.id,
-            "title": article.title,
-            "category": article.category.value,
-            "tags": article.tags,
-            "type": "tenant_kb"
-        })
-
-        if chunks:
-            texts = [c["content"] for c in chunks]
-            metadata = [c["metadata"] for c in chunks]
-            store.add(texts, metadata)
-            total_chunks += len(chunks)
-
-        # Mark as indexed
-        article.is_indexed = True
+    Runs may overlap (one is queued per article change). A run whose index
+    snapshot was superseded by another run's swap starts over from fresh
+    article state instead of swapping in stale chunks.
+    """
+    for attempt in range(INDEX_ATTEMPTS):
+        try:
+            return _index_tenant_kb_once(db, tenant_id, incremental)
+        except StoreChangedError:
+            if attempt == INDEX_ATTEMPTS - 1:
+                raise
+            logger.info("Tenant %s KB index changed during indexing; retrying", tenant_id)
+            db.rollback()
+            db.expire_all()  # Re-read is_indexed / updated_at written by the other run
+
+
+def _index_tenant_kb_once(db: Session, tenant_id: int, incremental: bool) -> int:
+    store = get_tenant_store(tenant_id, "kb")
 
+    # Articles are read before the index: one marked indexed here was swapped in before we look
+    articles = db.query(KBArticle).filter(KBArticle.tenant_id == tenant_id).all()
+    active = [article for article in articles if article.is_active]
+    # Everything below is derived from this version; the swap is refused if it moved on
+    store.refresh()
+    version = store.version
+    if incremental and store.dimension == store.configured_dimension:
+        current = {article.id for article in active if article.is_indexed}
+        article_ids = store.columns()["article_id"]
+        keep = np.flatnonzero(np.isin(article_ids, list(current)))
+        active = [article for article in active if not article.is_indexed]
+        if not active and keep.shape[0] == store.count:
+            return 0
+        kept_metadata, kept_vectors = store.fetch(keep)
+    else:
+        kept_metadata, kept_vectors = [], None
+
+    texts = [meta.pop("content") for meta in kept_metadata]
+    metadata = kept_metadata
+    new_chunks = [chunk for article in active for chunk in _chunk_article(article)]
+    texts.extend(c["content"] for c in new_chunks)
+    metadata.extend(c["metadata"] for c in new_chunks)
+
+    embeddings = None
+    if kept_vectors is not None and new_chunks:
+        new_vectors = embed_texts([c["content"] for c in new_chunks], dimensions=store.dimension)
+        embeddings = np.vstack([kept_vectors, new_vectors])
+    elif kept_vectors is not None:
+        embeddings = kept_vectors
+
+    # Built aside and swapped in whole, so searches never see a half-built index
+    with store.rebuild(expected_version=version) as shadow:
+        shadow.add(texts, metadata, embeddings=embeddings)
+
+    # Their chunks are in the generation just swapped in. Only articles not edited meanwhile; an edit during indexing leaves its article for the next run
+    for article in active:
+        db.query(KBArticle).filter(
+            KBArticle.id == article.id,
+            KBArticle.updated_at == article.updated_at,
+        ).update({"is_indexed": True}, synchronize_session=False)
     db.commit()
-    return total_chunks
+    return len(new_chunks)
 
 
-def search_tenant_kb(tenant_id: int, query: str, top_k: int = 5) -> List[Dict]:
+def index_tenant_kb_in_background(tenant_id: int) -> None:
+    """
+    Incremental index_tenant_kb for a BackgroundTasks job after an article
+    changes. Opens its own session, since the request's is closed by then.
+    """
+    db = SessionLocal()
+    try:
+        index_tenant_kb(db, tenant_id, incremental=True)
+    except Exception:
+        logger.exception("Incremental KB indexing for tenant %s failed", tenant_id)
+    finally:
+        db.close()
+
+
+def search_tenant_kb(
+    tenant_id: int,
+    query: str,
+    top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    mode: str = "vector",
+    return_embeddings: bool = False,
+) -> List[Dict]:
     """Search tenant-specific knowledge base."""
     store = get_tenant_store(tenant_id, "kb")
-    results = store.search(query, top_k=top_k)
+    results = store.search(
+        query, top_k=top_k, query_embedding=query_embedding, mode=mode, return_embeddings=return_embeddings
+    )
     return [{
         "content": r[0]["content"],
         "score": r[1],
+        **({"embedding": r[2]} if return_embeddings else {}),
         "source": r[0].get("source", ""),
         "category": r[0].get("category"),
         "article_id": r[0].get("article_id"),
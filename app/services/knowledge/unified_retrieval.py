@@ -1,12 +1,27 @@
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, replace
+import numpy as np
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.models import RerankingConfig
+from app.services.embeddings import embed_query, get_global_kb_store, get_tenant_store
 from app.services.knowledge.global_kb_service import search_global_kb
 from app.services.knowledge.tenant_kb_service import search_tenant_kb
 from app.services.knowledge.examples_service import search_examples
 from app.services.knowledge.corrections_service import search_corrections
+from app.services.knowledge.retrieval_cache import get_retrieval_cache, query_hash
+
+logger = logging.getLogger(__name__)
+
+# Runs the query embedding and the per-source searches, which retrieve_context
+# may stop waiting for (RETRIEVAL_EMBED_TIMEOUT_MS / RETRIEVAL_SOURCE_TIMEOUT_MS)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
 
 
 @dataclass
@@ -16,6 +31,7 @@ class RetrievalResult:
     source: str
     source_type: str  # global_kb, tenant_kb, example, correction
     metadata: Dict
+    embedding: Optional[np.ndarray] = None  # Stored unit vector (at its store's dimension), reused by the reranker
 
 
 @dataclass
@@ -26,6 +42,10 @@ class RetrievalContext:
     examples: List[RetrievalResult]
     corrections: List[RetrievalResult]
     merged: List[RetrievalResult]  # Weighted merge
+    query_embedding: Optional[np.ndarray] = None  # Full-size query vector, reusable by the reranker
+    mode: str = "vector"  # Ranking actually used (lexical when the embedding timed out)
+    timings: Dict[str, float] = field(default_factory=dict)  # Milliseconds per step ("embed", each source)
+    degraded_sources: List[str] = field(default_factory=list)  # Sources that timed out or failed (left empty)
 
 
 def get_default_weights() -> Dict[str, float]:
@@ -54,22 +74,163 @@ def get_tenant_weights(db: Session, tenant_id: int) -> Dict[str, float]:
     return get_default_weights()
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, get_settings().retrieval_max_workers),
+                    thread_name_prefix="retrieval",
+                )
+    return _executor
+
+
+def _embed_or_fallback(query: str, mode: str) -> Tuple[Optional[np.ndarray], str]:
+    """
+    Embed the query for `mode`, switching to lexical-only retrieval if the
+    embedding API errors or exceeds RETRIEVAL_EMBED_TIMEOUT_MS.
+    """
+    timeout_ms = get_settings().retrieval_embed_timeout_ms
+    if timeout_ms <= 0:
+        return embed_query(query), mode
+    future = _get_executor().submit(embed_query, query)
+    try:
+        # A late result still lands in the query cache for the next request
+        return future.result(timeout=timeout_ms / 1000), mode
+    except FutureTimeoutError:
+        logger.warning("Query embedding exceeded %d ms; using lexical retrieval", timeout_ms)
+    except Exception:
+        logger.exception("Query embedding failed; using lexical retrieval")
+    return None, "lexical"
+
+
+def _search_sources(searches: Dict[str, Callable[[], List[Dict]]]) -> Tuple[Dict, Dict[str, float], List[str]]:
+    """
+    Run the source searches on the shared pool; returns (results, timings in ms, degraded sources).
+
+    All sources share one RETRIEVAL_SOURCE_TIMEOUT_MS deadline. A source that
+    misses it or raises contributes no results rather than failing the request;
+    a timed-out search keeps running in the background (it still warms the store cache).
+    """
+    timeout_ms = get_settings().retrieval_source_timeout_ms
+    started = time.perf_counter()
+    deadline = started + timeout_ms / 1000 if timeout_ms > 0 else None
+
+    results, timings, degraded = {}, {}, []
+
+    def timed(name, search):
+        search_started = time.perf_counter()
+        try:
+            return search()
+        finally:
+            timings[name] = (time.perf_counter() - search_started) * 1000
+
+    executor = _get_executor()
+    futures = {name: executor.submit(timed, name, search) for name, search in searches.items()}
+
+    for name, future in futures.items():
+        remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            logger.warning("Retrieval source %s exceeded %d ms; continuing without it", name, timeout_ms)
+            results[name] = []
+            timings[name] = (time.perf_counter() - started) * 1000
+            degraded.append(name)
+        except Exception:
+            logger.exception("Retrieval source %s failed; continuing without it", name)
+            results[name] = []
+            degraded.append(name)
+    # Late finishers must not overwrite the reported wait
+    return results, dict(timings), degraded
+
+
+def _store_versions(tenant_id: int) -> Tuple[int, ...]:
+    """Write versions of the four stores retrieve_context searches (refreshed from disk if stale)."""
+    stores = [get_global_kb_store()] + [
+        get_tenant_store(tenant_id, store_type) for store_type in ("kb", "examples", "corrections")
+    ]
+    return tuple(store.version for store in stores)
+
+
+def _copy_context(context: RetrievalContext) -> RetrievalContext:
+    """Copy with fresh result objects, so callers can rescore or reassign them without touching the cache."""
+    copies: Dict[int, RetrievalResult] = {}
+
+    def copy_results(results: List[RetrievalResult]) -> List[RetrievalResult]:
+        for result in results:
+            if id(result) not in copies:
+                copies[id(result)] = replace(result, metadata=dict(result.metadata))
+        return [copies[id(result)] for result in results]
+
+    return replace(
+        context,
+        global_kb=copy_results(context.global_kb),
+        tenant_kb=copy_results(context.tenant_kb),
+        examples=copy_results(context.examples),
+        corrections=copy_results(context.corrections),
+        merged=copy_results(context.merged),
+        timings=dict(context.timings),
+        degraded_sources=list(context.degraded_sources),
+    )
+
+
 def retrieve_context(
     db: Session,
     tenant_id: int,
     query: str,
     top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    mode: Optional[str] = None,
 ) -> RetrievalContext:
     """
     Retrieve context from all 4 sources and merge with weights.
+    The query is embedded once (unless a vector is passed in) and shared by every source.
+
+    `mode` (default RETRIEVAL_MODE) selects vector, hybrid (vector + BM25) or
+    lexical ranking; see FAISSStore.search.
+
+    Results are cached per (tenant, query, top_k, weights, mode, store versions),
+    so repeated retrievals for an unchanged ticket and index skip all searches.
     """
     weights = get_tenant_weights(db, tenant_id)
+    mode = mode or get_settings().retrieval_mode
+    timings: Dict[str, float] = {}
 
-    # Search all sources
-    global_results = search_global_kb(query, top_k=top_k)
-    tenant_results = search_tenant_kb(tenant_id, query, top_k=top_k)
-    example_results = search_examples(tenant_id, query, top_k=top_k)
-    correction_results = search_corrections(tenant_id, query, top_k=3)
+    cache = get_retrieval_cache()
+    if cache is not None:
+        started = time.perf_counter()
+        cache_key = (
+            tenant_id, query_hash(query), top_k, tuple(sorted(weights.items())), mode, _store_versions(tenant_id)
+        )
+        cached = cache.get(tenant_id, cache_key)
+        if cached is not None:
+            context = _copy_context(cached)
+            context.timings = {"cache": (time.perf_counter() - started) * 1000}
+            return context
+        timings["cache"] = (time.perf_counter() - started) * 1000
+    requested_mode = mode
+
+    if query_embedding is None and mode != "lexical":
+        started = time.perf_counter()
+        query_embedding, mode = _embed_or_fallback(query, mode)
+        timings["embed"] = (time.perf_counter() - started) * 1000
+
+    # Search all sources concurrently (store loads, numpy scans and SQLite reads release the GIL)
+    options = {"query_embedding": query_embedding, "mode": mode, "return_embeddings": True}
+    searches = {
+        "global_kb": lambda: search_global_kb(query, top_k=top_k, **options),
+        "tenant_kb": lambda: search_tenant_kb(tenant_id, query, top_k=top_k, **options),
+        "examples": lambda: search_examples(tenant_id, query, top_k=top_k, **options),
+        "corrections": lambda: search_corrections(tenant_id, query, top_k=3, **options),
+    }
+    found, source_timings, degraded = _search_sources(searches)
+    timings.update(source_timings)
+    global_results = found["global_kb"]
+    tenant_results = found["tenant_kb"]
+    example_results = found["examples"]
+    correction_results = found["corrections"]
 
     # Convert to RetrievalResult
     def to_results(items: List[Dict], source_type: str) -> List[RetrievalResult]:
@@ -79,6 +240,7 @@ def retrieve_context(
                 score=item["score"],
                 source=item.get("source", ""),
                 source_type=source_type,
+                embedding=item.pop("embedding", None),
                 metadata=item
             )
             for item in items
@@ -89,55 +251,66 @@ def retrieve_context(
     examples = to_results(example_results, "example")
     corrections = to_results(correction_results, "correction")
 
-    # Weighted merge
+    # Weighted merge. Hybrid hits carry cosine scores too, so every mode merges on
+    # relevance; ranks alone would let a heavily weighted source crowd out the others
     all_results = []
-    for result in global_kb:
-        result.score *= weights["global_kb"]
-        all_results.append(result)
-    for result in tenant_kb:
-        result.score *= weights["tenant_kb"]
-        all_results.append(result)
-    for result in examples:
-        result.score *= weights["examples"]
-        all_results.append(result)
-    for result in corrections:
-        result.score *= weights["corrections"]
-        all_results.append(result)
+    for results, weight in (
+        (global_kb, weights["global_kb"]),
+        (tenant_kb, weights["tenant_kb"]),
+        (examples, weights["examples"]),
+        (corrections, weights["corrections"]),
+    ):
+        for result in results:
+            result.score *= weight
+            all_results.append(result)
 
     # Sort by weighted score and take top_k
     merged = sorted(all_results, key=lambda x: x.score, reverse=True)[:top_k]
 
-    return RetrievalContext(
+    context = RetrievalContext(
         global_kb=global_kb,
         tenant_kb=tenant_kb,
         examples=examples,
         corrections=corrections,
-        merged=merged
+        merged=merged,
+        query_embedding=query_embedding,
+        mode=mode,
+        timings=timings,
+        degraded_sources=degraded,
     )
+    # Degraded results (lexical fallback, dropped sources) are not worth repeating
+    if cache is not None and mode == requested_mode and not degraded:
+        cache.put(cache_key, _copy_context(context))
+    return context
+
+
+# Results per source shown in the prompt by format_context_for_prompt
+PROMPT_SECTION_LIMITS = {"global_kb": 3, "tenant_kb": 3, "examples": 2, "corrections": 2}
 
 
 def format_context_for_prompt(context: RetrievalContext) -> str:
     """Format retrieved context for LLM prompt."""
     sections = []
+    limits = PROMPT_SECTION_LIMITS
 
     # Global KB
     if context.global_kb:
-        kb_text = "\n\n".join([r.content for r in context.global_kb[:3]])
+        kb_text = "\n\n".join([r.content for r in context.global_kb[:limits["global_kb"]]])
         sections.append(f"## Hosting Knowledge\n{kb_text}")
 
     # Tenant KB
     if context.tenant_kb:
-        tenant_text = "\n\n".join([r.content for r in context.tenant_kb[:3]])
+        tenant_text = "\n\n".join([r.content for r in context.tenant_kb[:limits["tenant_kb"]]])
         sections.append(f"## Company Knowledge\n{tenant_text}")
 
     # Examples
     if context.examples:
-        example_text = "\n\n---\n\n".join([r.content for r in context.examples[:2]])
+        example_text = "\n\n---\n\n".join([r.content for r in context.examples[:limits["examples"]]])
         sections.append(f"## Similar Past Tickets (Approved Responses)\n{example_text}")
 
     # Corrections (important to avoid mistakes)
     if context.corrections:
-        correction_text = "\n\n---\n\n".join([r.content for r in context.corrections[:2]])
+        correction_text = "\n\n---\n\n".join([r.content for r in context.corrections[:limits["corrections"]]])
         sections.append(f"## Corrections (Avoid These Mistakes)\n{correction_text}")
 
     return "\n\n".join(sections)
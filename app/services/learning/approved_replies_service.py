@@ -104,47 +104,45 @@ def rebuild_examples_index(db: Session, tenant_id: int) -> int:
     Use when index is corrupted or after bulk changes.
     """
     store = get_tenant_store(tenant_id, "examples")
-    store.clear()
 
-    # Get all approved replies that aren't corrections
-    approved_replies = db.query(ApprovedReply, Ticket).join(
-        Ticket, ApprovedReply.ticket_id == Ticket.id
-    ).filter(
-        Ticket.tenant_id == tenant_id,
-        ApprovedReply.is_correction == False
-    ).all()
-
-    if not approved_replies:
-        return 0
+    def load_examples():
+        # Get all approved replies that aren't corrections
+        approved_replies = db.query(ApprovedReply, Ticket).join(
+            Ticket, ApprovedReply.ticket_id == Ticket.id
+        ).filter(
+            Ticket.tenant_id == tenant_id,
+            ApprovedReply.is_correction == False
+        ).all()
 
-    texts = []
-    metadata_list = []
+        texts = []
+        metadata_list = []
 
-    for approved, ticket in approved_replies:
-        example_text = f"""Customer Issue: {ticket.subject}
+        for approved, ticket in approved_replies:
+            example_text = f"""Customer Issue: {ticket.subject}
 {ticket.content}
 
 Approved Response:
 {approved.final_reply}"""
 
-        texts.append(example_text)
-        metadata_list.append({
-            "source": f"example_{approved.id}",
-            "ticket_id": ticket.id,
-            "reply_id": approved.id,
-            "subject": ticket.subject,
-            "department": ticket.department,
-            "type": "approved_example",
-            "was_edited": approved.edited,
-            "similarity_ratio": approved.edit_distance,
-        })
-
-        approved.used_for_training = True
-
-    store.add(texts, metadata_list)
+            texts.append(example_text)
+            metadata_list.append({
+                "source": f"example_{approved.id}",
+                "ticket_id": ticket.id,
+                "reply_id": approved.id,
+                "subject": ticket.subject,
+                "department": ticket.department,
+                "type": "approved_example",
+                "was_edited": approved.edited,
+                "similarity_ratio": approved.edit_distance,
+            })
+
+            approved.used_for_training = True
+        return texts, metadata_list
+
+    count = store.rebuild_from(load_examples)
     db.commit()
 
-    return len(texts)
+    return count
 
 
 def get_approved_replies(
@@ -106,31 +106,28 @@ def generate_edit_summary(original: str, corrected: str) -> str:
 def rebuild_corrections_index(db: Session, tenant_id: int) -> int:
     """Rebuild entire corrections index from approved replies marked as corrections."""
     store = get_tenant_store(tenant_id, "corrections")
-    store.clear()
 
-    # Get all corrections with AI replies
-    corrections = db.query(ApprovedReply, Ticket, AIReply).join(
-        Ticket, ApprovedReply.ticket_id == Ticket.id
-    ).join(
-        AIReply, ApprovedReply.ai_reply_id == AIReply.id
-    ).filter(
-        Ticket.tenant_id == tenant_id,
-        ApprovedReply.is_correction == True,
-        ApprovedReply.ai_reply_id.isnot(None)
-    ).all()
-
-    if not corrections:
-        return 0
-
-    texts = []
-    metadata_list = []
-
-    for approved, ticket, ai_reply in corrections:
-        edit_summary = approved.edit_summary or generate_edit_summary(
-            ai_reply.ai_reply, approved.final_reply
-        )
-
-        correction_text = f"""Customer Issue: {ticket.subject}
+    def load_corrections():
+        # Get all corrections with AI replies
+        corrections = db.query(ApprovedReply, Ticket, AIReply).join(
+            Ticket, ApprovedReply.ticket_id == Ticket.id
+        ).join(
+            AIReply, ApprovedReply.ai_reply_id == AIReply.id
+        ).filter(
+            Ticket.tenant_id == tenant_id,
+            ApprovedReply.is_correction == True,
+            ApprovedReply.ai_reply_id.isnot(None)
+        ).all()
+
+        texts = []
+        metadata_list = []
+
+        for approved, ticket, ai_reply in corrections:
+            edit_summary = approved.edit_summary or generate_edit_summary(
+                ai_reply.ai_reply, approved.final_reply
+            )
+
+            correction_text = f"""Customer Issue: {ticket.subject}
 {ticket.content}
 
 INCORRECT AI Response (Avoid This):
@@ -141,28 +138,29 @@ CORRECT Response (Use This Instead):
 
 What Was Wrong: {edit_summary}"""
 
-        texts.append(correction_text)
-        metadata_list.append({
-            "source": f"correction_{approved.id}",
-            "ticket_id": ticket.id,
-            "ai_reply_id": ai_reply.id,
-            "approved_reply_id": approved.id,
-            "subject": ticket.subject,
-            "department": ticket.department,
-            "intent": ai_reply.intent_detected,
-            "original_confidence": ai_reply.confidence_score,
-            "edit_summary": edit_summary,
-            "type": "correction",
-        })
-
-        # Update summary if not set
-        if not approved.edit_summary:
-            approved.edit_summary = edit_summary
-
-    store.add(texts, metadata_list)
+            texts.append(correction_text)
+            metadata_list.append({
+                "source": f"correction_{approved.id}",
+                "ticket_id": ticket.id,
+                "ai_reply_id": ai_reply.id,
+                "approved_reply_id": approved.id,
+                "subject": ticket.subject,
+                "department": ticket.department,
+                "intent": ai_reply.intent_detected,
+                "original_confidence": ai_reply.confidence_score,
+                "edit_summary": edit_summary,
+                "type": "correction",
+            })
+
+            # Update summary if not set
+            if not approved.edit_summary:
+                approved.edit_summary = edit_summary
+        return texts, metadata_list
+
+    count = store.rebuild_from(load_corrections)
     db.commit()
 
-    return len(texts)
+    return count
 
 
 def get_corrections(
@@ -1,9 +1,14 @@
 from app.services.llm.llm_service import generate_completion, generate_with_messages
-from app.services.llm.reranker import rerank_results, rerank_with_diversity
+from app.services.llm.reranker import rerank_results, rerank_with_diversity, select_diverse
+from app.services.llm.rerank_scorers import RerankScorer, get_rerank_scorer, register_rerank_scorer
 
 __all__ = [
     "generate_completion",
     "generate_with_messages",
     "rerank_results",
     "rerank_with_diversity",
+    "select_diverse",
+    "RerankScorer",
+    "get_rerank_scorer",
+    "register_rerank_scorer",
 ]
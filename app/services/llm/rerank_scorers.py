@@ -0,0 +1,104 @@
+"""Second-stage scorers for the reranker, selectable by name (RERANK_SCORER)."""
+
+import math
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.embeddings.embedding_service import embed_texts, truncate_embeddings
+from app.services.embeddings.lexical_index import tokenize
+from app.services.knowledge.unified_retrieval import RetrievalResult
+
+
+class RerankScorer(ABC):
+    """
+    Scores retrieved candidates against the query, higher is better.
+
+    Scores should stay on a 0-1 scale: rerank_results applies the tenant's
+    score_threshold to them and the confidence engine reads them as similarities.
+    """
+
+    # rerank_results embeds the query first when it isn't available yet
+    needs_query_embedding: bool = True
+
+    @abstractmethod
+    def score(
+        self, query: str, results: List[RetrievalResult], query_embedding: Optional[np.ndarray]
+    ) -> np.ndarray:
+        ...
+
+
+class VectorRerankScorer(RerankScorer):
+    """
+    Cosine similarity between the query and each result's stored vector.
+
+    Results carry the unit vector of the store they came from (possibly at a
+    shortened dimension), so the query is cut to each vector's size and no
+    embedding request is made; only results without a vector are embedded.
+    """
+
+    def score(self, query, results, query_embedding):
+        vectors = [r.embedding for r in results]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            for i, vector in zip(missing, embed_texts([results[i].content for i in missing])):
+                vectors[i] = vector
+
+        by_dimension = defaultdict(list)
+        for i, vector in enumerate(vectors):
+            by_dimension[vector.shape[0]].append(i)
+
+        scores = np.empty(len(results), dtype=np.float32)
+        for dimension, indices in by_dimension.items():
+            # truncate_embeddings also re-normalizes, so fetched vectors score as cosines too
+            docs = truncate_embeddings(np.vstack([vectors[i] for i in indices]), dimension)
+            scores[indices] = docs @ truncate_embeddings(query_embedding, dimension)
+        return scores
+
+
+class LexicalRerankScorer(RerankScorer):
+    """
+    IDF-weighted share of query terms found in each result's content or
+    title fields (subject, source), with IDF taken over the candidate set.
+    Needs no embeddings at all.
+    """
+
+    needs_query_embedding = False
+    TITLE_FIELDS = ("subject", "source")
+
+    def score(self, query, results, query_embedding):
+        terms = set(tokenize(query))
+        if not terms:
+            return np.zeros(len(results), dtype=np.float32)
+
+        documents = []
+        for r in results:
+            titles = " ".join(str(r.metadata.get(field) or "") for field in self.TITLE_FIELDS)
+            documents.append(set(tokenize(r.content)) | set(tokenize(titles)))
+
+        n = len(documents)
+        idf = {t: math.log(1 + (n + 0.5) / (sum(t in d for d in documents) + 0.5)) for t in terms}
+        total = sum(idf.values())
+        return np.array([sum(idf[t] for t in terms & d) / total for d in documents], dtype=np.float32)
+
+
+RERANK_SCORERS: Dict[str, Type[RerankScorer]] = {
+    "vector": VectorRerankScorer,
+    "lexical": LexicalRerankScorer,
+}
+
+
+def register_rerank_scorer(name: str, scorer: Type[RerankScorer]) -> None:
+    """Make a second-stage scorer selectable by name (e.g. via RERANK_SCORER)."""
+    RERANK_SCORERS[name] = scorer
+
+
+def get_rerank_scorer(name: Optional[str] = None) -> RerankScorer:
+    """Scorer `name`, or the one configured by RERANK_SCORER."""
+    name = name or get_settings().rerank_scorer
+    if name not in RERANK_SCORERS:
+        raise ValueError(f"Unknown rerank scorer '{name}'. Available: {sorted(RERANK_SCORERS)}")
+    return RERANK_SCORERS[name]()
@@ -1,15 +1,10 @@
-from typing import List, Tuple, Optional
+from typing import List, Optional
 import numpy as np
 
-from app.services.embeddings.embedding_service import embed_texts, embed_query
+from app.services.embeddings.embedding_service import embed_query, truncate_embeddings
+from app.services.embeddings.similarity import mmr_select, top_k_indices
 from app.services.knowledge.unified_retrieval import RetrievalResult
-
-
-def _cosine_similarities(query_embedding: np.ndarray, doc_embeddings: np.ndarray) -> np.ndarray:
-    """Compute cosine similarity between query and each document."""
-    query_norm = query_embedding / (np.linalg.norm(query_embedding) + 1e-9)
-    doc_norms = doc_embeddings / (np.linalg.norm(doc_embeddings, axis=1, keepdims=True) + 1e-9)
-    return np.dot(doc_norms, query_norm)
+from app.services.llm.rerank_scorers import get_rerank_scorer
 
 
 def rerank_results(
@@ -17,67 +12,91 @@ def rerank_results(
     results: List[RetrievalResult],
     top_k: int = 5,
     score_threshold: float = 0.0,
+    query_embedding: Optional[np.ndarray] = None,
+    scorer: Optional[str] = None,
 ) -> List[RetrievalResult]:
     """
-    Rerank retrieval results using OpenAI embeddings cosine similarity.
-    Re-embeds query and documents for a fresh similarity comparison.
+    Rerank retrieval results with a second-stage scorer (default RERANK_SCORER, see rerank_scorers.py).
+    The default "vector" scorer rescores the stored vectors results carry, so nothing is re-embedded;
+    the query is only embedded if no `query_embedding` (e.g. RetrievalContext.query_embedding) is given.
     """
     if not results:
         return []
 
-    # Embed query and all result contents via OpenAI
-    query_embedding = embed_query(query)
-    doc_embeddings = embed_texts([r.content for r in results])
-
-    # Compute cosine similarity scores
-    scores = _cosine_similarities(query_embedding, doc_embeddings)
-
-    # Attach scores and filter
-    scored_results = []
-    for result, score in zip(results, scores):
-        if score >= score_threshold:
-            scored_results.append(RetrievalResult(
-                content=result.content,
-                score=float(score),
-                source=result.source,
-                source_type=result.source_type,
-                metadata={**result.metadata, "original_score": result.score}
-            ))
-
-    # Sort by reranker score
-    scored_results.sort(key=lambda x: x.score, reverse=True)
-
-    return scored_results[:top_k]
+    rerank_scorer = get_rerank_scorer(scorer)
+    if query_embedding is None and rerank_scorer.needs_query_embedding:
+        query_embedding = embed_query(query)
+    scores = rerank_scorer.score(query, results, query_embedding)
+
+    # Filter by threshold and keep the best top_k, highest reranker score first
+    return [
+        RetrievalResult(
+            content=results[idx].content,
+            score=float(scores[idx]),
+            source=results[idx].source,
+            source_type=results[idx].source_type,
+            metadata={**results[idx].metadata, "original_score": results[idx].score},
+            embedding=results[idx].embedding,
+        )
+        for idx in top_k_indices(scores, top_k, score_threshold)
+    ]
+
+
+def _result_vectors(results: List[RetrievalResult]) -> np.ndarray:
+    """
+    Stored vectors of `results` as unit rows at their smallest common dimension.
+    Results without a vector get a zero row, i.e. they never count as a duplicate.
+    """
+    dims = [r.embedding.shape[0] for r in results if r.embedding is not None]
+    vectors = np.zeros((len(results), min(dims) if dims else 1), dtype=np.float32)
+    for i, r in enumerate(results):
+        if r.embedding is not None:
+            vectors[i] = truncate_embeddings(r.embedding, vectors.shape[1])
+    return vectors
 
 
-def rerank_with_diversity(
-    query: str,
+def select_diverse(
     results: List[RetrievalResult],
     top_k: int = 5,
-    diversity_threshold: float = 0.7,
+    mmr_lambda: float = 0.7,
+    max_per_source: Optional[int] = None,
+    max_similarity: Optional[float] = None,
 ) -> List[RetrievalResult]:
     """
-    Rerank with diversity: avoid too similar results.
-    Uses MMR-like approach.
+    Maximal Marginal Relevance over `results` using their current scores and stored vectors
+    (no embedding calls). `mmr_lambda` trades relevance (1.0) against novelty (0.0);
+    `max_per_source` caps picks per source_type; results at least `max_similarity`
+    similar to a pick are dropped as near-duplicates.
     """
     if not results:
         return []
+    picked = mmr_select(
+        np.array([r.score for r in results], dtype=np.float32),
+        _result_vectors(results),
+        top_k,
+        lambda_mult=mmr_lambda,
+        groups=np.array([r.source_type for r in results]),
+        max_per_group=max_per_source,
+        max_similarity=max_similarity,
+    )
+    return [results[i] for i in picked]
 
-    reranked = rerank_results(query, results, top_k=len(results))
-
-    if len(reranked) <= top_k:
-        return reranked
 
-    # Simple diversity: prefer different source types
-    selected = []
-    source_types_seen = set()
-
-    for result in reranked:
-        # Always add if we haven't reached top_k
-        if len(selected) < top_k:
-            # Prefer diverse source types first
-            if result.source_type not in source_types_seen or len(selected) >= top_k - 2:
-                selected.append(result)
-                source_types_seen.add(result.source_type)
-
-    return selected[:top_k]
+def rerank_with_diversity(
+    query: str,
+    results: List[RetrievalResult],
+    top_k: int = 5,
+    score_threshold: float = 0.0,
+    mmr_lambda: float = 0.7,
+    max_per_source: Optional[int] = None,
+    max_similarity: Optional[float] = None,
+    query_embedding: Optional[np.ndarray] = None,
+) -> List[RetrievalResult]:
+    """
+    Rerank, then pick top_k by Maximal Marginal Relevance (see select_diverse), so
+    overlapping chunks of one document don't crowd out other evidence.
+    """
+    reranked = rerank_results(
+        query, results, top_k=len(results), score_threshold=score_threshold, query_embedding=query_embedding
+    )
+    return select_diverse(reranked, top_k, mmr_lambda, max_per_source, max_similarity)
@@ -1,10 +1,12 @@
 from typing import Dict, Optional, List
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.models import Ticket, PromptVersion, RerankingConfig
 from app.services.knowledge import retrieve_context, format_context_for_prompt, RetrievalContext
-from app.services.llm import generate_completion, rerank_results
+from app.services.knowledge.unified_retrieval import PROMPT_SECTION_LIMITS
+from app.services.llm import generate_completion, get_rerank_scorer, rerank_with_diversity, select_diverse
 from app.services.confidence import calculate_confidence, ConfidenceResult, ConfidenceLevel
 
 
@@ -48,6 +50,30 @@ def get_reranking_config(db: Session, tenant_id: int) -> Optional[RerankingConfi
     ).first()
 
 
+def diversify_prompt_context(context: RetrievalContext) -> RetrievalContext:
+    """
+    Drop near-duplicate chunks (overlapping chunk windows, one text in two stores) from
+    the results the prompt shows, by MMR over their stored vectors. Corrections are
+    always kept: they are warnings, not evidence.
+    """
+    settings = get_settings()
+    shown = {
+        name: getattr(context, name)[:limit]
+        for name, limit in PROMPT_SECTION_LIMITS.items()
+        if name != "corrections"
+    }
+    candidates = [r for results in shown.values() for r in results]
+    kept = {
+        id(r) for r in select_diverse(
+            candidates,
+            top_k=len(candidates),
+            mmr_lambda=settings.rerank_mmr_lambda,
+            max_similarity=settings.rerank_max_similarity,
+        )
+    }
+    return replace(context, **{name: [r for r in results if id(r) in kept] for name, results in shown.items()})
+
+
 def build_prompt(
     ticket: Ticket,
     context: RetrievalContext,
@@ -117,12 +143,19 @@ def generate_reply(
     reranked_sources = []
     reranking_config = get_reranking_config(db, tenant_id)
 
-    if use_reranking and reranking_config and reranking_config.is_enabled:
-        reranked = rerank_results(
+    # Lexical retrieval (configured, or the embedding API timed out) has no query vector for vector rescoring
+    can_rerank = context.query_embedding is not None or not get_rerank_scorer().needs_query_embedding
+    if use_reranking and reranking_config and reranking_config.is_enabled and can_rerank:
+        settings = get_settings()
+        reranked = rerank_with_diversity(
             query,
             context.merged,
             top_k=reranking_config.top_k_rerank,
-            score_threshold=reranking_config.score_threshold
+            score_threshold=reranking_config.score_threshold,
+            mmr_lambda=settings.rerank_mmr_lambda,
+            max_per_source=settings.rerank_max_per_source or None,
+            max_similarity=settings.rerank_max_similarity,
+            query_embedding=context.query_embedding,
         )
         reranked_sources = [{"content": r.content, "score": r.score, "source": r.source} for r in reranked]
         context.merged = reranked
@@ -141,7 +174,7 @@ def generate_reply(
         prompt_version = get_active_prompt(db, tenant_id)
 
     # 5. Build prompts
-    system_prompt, user_prompt = build_prompt(ticket, context, prompt_version)
+    system_prompt, user_prompt = build_prompt(ticket, diversify_prompt_context(context), prompt_version)
 
     # 6. Generate reply with optional overrides
     model = override_model or (prompt_version.model if prompt_version else "gpt-4o-mini")
@@ -0,0 +1,13 @@
+"""
+Offline micro-benchmarks for the retrieval stack.
+
+Run from the repo root, e.g. `python -m benchmarks.bench_topk`. Importing
+`app.services` loads Settings, so placeholder values are provided for the
+required fields; the benchmarks never touch the database. Embeddings come
+from the offline hashing backend unless EMBEDDING_BACKEND says otherwise.
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
@@ -0,0 +1,65 @@
+"""
+Recall@k vs latency: exact scan vs IVF at several nprobe settings.
+
+    python -m benchmarks.bench_ann [rows] [dimension]
+
+Vectors are drawn from a mixture of Gaussian clusters (real embedding sets
+are clustered by topic; uniform random vectors are a worst case for any
+ANN index). Queries are perturbed copies of stored vectors.
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.services.embeddings.ann_index import IVFIndex
+from app.services.embeddings.similarity import top_k_indices
+
+TOP_K = 10
+N_QUERIES = 200
+NPROBES = (4, 8, 16, 32, 64)
+
+
+def clustered_vectors(rng, n: int, dim: int, n_clusters: int = 5000) -> np.ndarray:
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, n_clusters, n)] + rng.normal(scale=1.0, size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 1536
+    rng = np.random.default_rng(0)
+
+    vectors = clustered_vectors(rng, n, dim)
+    queries = vectors[rng.integers(0, n, N_QUERIES)] + rng.normal(scale=0.03, size=(N_QUERIES, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    truth = [set(top_k_indices(vectors @ q, TOP_K).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / N_QUERIES
+
+    index = IVFIndex()
+    start = time.perf_counter()
+    index.build(vectors)
+    build_s = time.perf_counter() - start
+
+    print(f"{n} vectors x {dim} dims, {index.centroids.shape[0]} lists, built in {build_s:.1f}s")
+    print(f"{'mode':>12} {'ms/query':>10} {'recall@' + str(TOP_K):>10} {'rows scanned':>13}")
+    print(f"{'exact':>12} {exact_ms:>10.3f} {1.0:>10.3f} {n:>13}")
+
+    for nprobe in NPROBES:
+        index.nprobe = nprobe
+        hits, scanned = 0, 0
+        start = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            rows, scores = index.search(vectors, q, TOP_K)
+            found = rows[top_k_indices(scores, TOP_K)] if rows is not None else top_k_indices(scores, TOP_K)
+            hits += len(expected & set(found.tolist()))
+            scanned += n if rows is None else rows.shape[0]
+        ivf_ms = (time.perf_counter() - start) * 1000 / N_QUERIES
+        print(f"{'ivf/' + str(nprobe):>12} {ivf_ms:>10.3f} {hits / (TOP_K * N_QUERIES):>10.3f} {scanned // N_QUERIES:>13}")
+
+
+if __name__ == "__main__":
+    main()
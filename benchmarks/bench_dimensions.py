@@ -0,0 +1,65 @@
+"""
+Retrieval quality vs memory and scan time for Matryoshka-truncated embeddings.
+
+    python -m benchmarks.bench_dimensions [index.npy] [rows]
+
+Pass a store's base matrix (e.g. data/indexes/global/global_kb.npy) to
+measure on real text-embedding-3 vectors; without one, synthetic clustered
+vectors whose variance decays along the dimensions stand in (Matryoshka
+training front-loads information, uniform random vectors would not).
+Held-out rows are the queries; recall@k is against the full-size top-k.
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.services.embeddings.embedding_service import truncate_embeddings
+from app.services.embeddings.similarity import top_k_indices
+
+TOP_K = 10
+N_QUERIES = 200
+DIMENSIONS = (1536, 1024, 768, 512, 256, 128)
+
+
+def synthetic_vectors(rng, n: int, dim: int = 1536, n_clusters: int = 2000) -> np.ndarray:
+    decay = (1.0 / np.sqrt(1.0 + np.arange(dim) / 32.0)).astype(np.float32)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32) * decay
+    vectors = centers[rng.integers(0, n_clusters, n)] + rng.normal(scale=0.5, size=(n, dim)).astype(np.float32) * decay
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    if len(sys.argv) > 1 and sys.argv[1].endswith(".npy"):
+        vectors = np.load(sys.argv[1]).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9
+        source = sys.argv[1]
+    else:
+        n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+        vectors = synthetic_vectors(rng, n)
+        source = "synthetic"
+
+    query_rows = rng.choice(vectors.shape[0], size=min(N_QUERIES, vectors.shape[0] // 10), replace=False)
+    queries = vectors[query_rows]
+    corpus = np.delete(vectors, query_rows, axis=0)
+    truth = [set(top_k_indices(corpus @ q, TOP_K).tolist()) for q in queries]
+
+    print(f"{source}: {corpus.shape[0]} vectors x {corpus.shape[1]} dims, {len(queries)} held-out queries")
+    print(f"{'dims':>6} {'MB':>8} {'ms/query':>10} {'recall@' + str(TOP_K):>10}")
+
+    for dim in DIMENSIONS:
+        if dim > corpus.shape[1]:
+            continue
+        matrix = truncate_embeddings(corpus, dim)
+        short_queries = truncate_embeddings(queries, dim)
+        hits = 0
+        start = time.perf_counter()
+        for q, expected in zip(short_queries, truth):
+            hits += len(expected & set(top_k_indices(matrix @ q, TOP_K).tolist()))
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{dim:>6} {matrix.nbytes / 2**20:>8.1f} {ms:>10.3f} {hits / (TOP_K * len(queries)):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
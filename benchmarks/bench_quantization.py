@@ -0,0 +1,58 @@
+"""
+Memory vs recall@k for float32, float16, bfloat16 and int8 storage, with and without float32 rescoring.
+
+    python -m benchmarks.bench_quantization [rows] [dimension]
+
+Uses the same clustered vectors as bench_ann. "bytes/row" is what the
+first-pass scan keeps hot; with rescoring the float32 file is also mapped
+but only the rescored rows are read.
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.services.embeddings.quantization import quantize
+from app.services.embeddings.similarity import top_k_indices
+from benchmarks.bench_ann import clustered_vectors
+
+TOP_K = 10
+N_QUERIES = 200
+RESCORE_FACTORS = (0, 2, 4, 8)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 1536
+    rng = np.random.default_rng(0)
+
+    vectors = clustered_vectors(rng, n, dim)
+    queries = vectors[rng.integers(0, n, N_QUERIES)] + rng.normal(scale=0.03, size=(N_QUERIES, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [set(top_k_indices(vectors @ q, TOP_K).tolist()) for q in queries]
+
+    print(f"{n} vectors x {dim} dims")
+    print(f"{'storage':>8} {'rescore':>8} {'MB':>8} {'bytes/row':>10} {'ms/query':>10} {'recall@' + str(TOP_K):>10}")
+
+    for storage in ("float32", "float16", "bfloat16", "int8"):
+        matrix = vectors if storage == "float32" else quantize(vectors, storage)
+        for factor in RESCORE_FACTORS if storage != "float32" else (0,):
+            hits = 0
+            start = time.perf_counter()
+            for q, expected in zip(queries, truth):
+                scores = matrix @ q
+                if factor:
+                    candidates = top_k_indices(scores, TOP_K * factor)
+                    found = candidates[top_k_indices(vectors[candidates] @ q, TOP_K)]
+                else:
+                    found = top_k_indices(scores, TOP_K)
+                hits += len(expected & set(found.tolist()))
+            ms = (time.perf_counter() - start) * 1000 / N_QUERIES
+            print(
+                f"{storage:>8} {factor or '-':>8} {matrix.nbytes / 2**20:>8.1f} {matrix.nbytes // n:>10} "
+                f"{ms:>10.3f} {hits / (TOP_K * N_QUERIES):>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
-"""Run this script to ingest global knowledge base into FAISS."""
+"""Run this script to ingest global knowledge base into FAISS (--full re-embeds every file)."""
+import sys
+
 from app.services.knowledge import ingest_global_kb, get_global_kb_stats
 
 if __name__ == "__main__":
     print("Starting global KB ingestion...")
-    ingest_global_kb()
+    ingest_global_kb(full="--full" in sys.argv)
     stats = get_global_kb_stats()
     print(f"Stats: {stats}")
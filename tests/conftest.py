@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+# Settings are read once at import; point everything at throwaway, offline backends first
+_tmp = tempfile.mkdtemp(prefix="support-assistant-tests-")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+os.environ.setdefault("EMBEDDING_DIMENSION", "256")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("QUERY_CACHE_MAX_ENTRIES", "0")
+os.environ.setdefault("RETRIEVAL_CACHE_MAX_ENTRIES", "0")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    """Run in an empty directory (indexes live under ./data/indexes) with no cached stores."""
+    from app.services.embeddings import get_store_registry
+
+    monkeypatch.chdir(tmp_path)
+    get_store_registry().clear()
+    yield tmp_path
+    get_store_registry().clear()
+
+
+@pytest.fixture
+def db(index_dir):
+    import app.models  # noqa: F401  (registers every table)
+    from app.db.session import SessionLocal, engine
+    from app.models.base import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
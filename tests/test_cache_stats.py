@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+from app.api.v1 import search
+
+
+def _stats():
+    return {
+        "hits": 5,
+        "misses": 3,
+        "by_tenant": {"1": {"hits": 4, "misses": 1}, "2": {"hits": 1, "misses": 2}, "anonymous": {"hits": 0, "misses": 0}},
+    }
+
+
+def test_cache_stats_only_show_the_callers_tenant(monkeypatch):
+    monkeypatch.setattr(search, "get_query_cache_stats", _stats)
+    monkeypatch.setattr(search, "get_retrieval_cache_stats", _stats)
+
+    stats = search.cache_stats(current_user=SimpleNamespace(tenant_id=2))
+
+    assert stats["queries"]["by_tenant"] == {"2": {"hits": 1, "misses": 2}}
+    assert stats["retrieval"]["by_tenant"] == {"2": {"hits": 1, "misses": 2}}
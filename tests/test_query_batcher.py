@@ -0,0 +1,46 @@
+import threading
+import time
+
+import numpy as np
+
+from app.services.embeddings.query_batcher import QueryBatcher
+
+
+def _embed_batch(delay=0.0):
+    def embed(texts, dimensions):
+        time.sleep(delay)
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+    return embed
+
+
+def test_lone_query_does_not_wait_for_the_window():
+    batcher = QueryBatcher(_embed_batch(), window_ms=200)
+    batcher.embed("warm up")
+
+    started = time.perf_counter()
+    vector = batcher.embed("single query")
+    elapsed = time.perf_counter() - started
+
+    assert vector[0] == len("single query")
+    assert elapsed < 0.1
+    assert batcher.stats()["immediate_batches"] == 2
+
+
+def test_concurrent_queries_are_still_coalesced():
+    batcher = QueryBatcher(_embed_batch(delay=0.05), window_ms=50)
+    results = {}
+
+    def call(i):
+        results[i] = batcher.embed(f"query {i:02d}")
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(results[i][0] == len(f"query {i:02d}") for i in range(20))
+    stats = batcher.stats()
+    assert stats["queries"] == 20
+    assert stats["batches"] < 20
+    assert stats["in_flight"] == 0
@@ -0,0 +1,94 @@
+from app.db.session import SessionLocal
+from app.models.kb_article import KBArticle, KBCategory
+from app.schemas.kb import KBArticleCreate, KBArticleUpdate
+from app.services.embeddings import get_tenant_store
+from app.services.knowledge import tenant_kb_service
+
+TENANT_ID = 1
+
+
+def _create(db, title, content):
+    data = KBArticleCreate(title=title, content=content, category=KBCategory.CUSTOM, tags="")
+    return tenant_kb_service.create_article(db, TENANT_ID, data)
+
+
+def _edit(article_id, content):
+    session = SessionLocal()
+    try:
+        article = tenant_kb_service.get_article(session, TENANT_ID, article_id)
+        tenant_kb_service.update_article(session, article, KBArticleUpdate(content=content))
+    finally:
+        session.close()
+
+
+def _indexed_content(article_id):
+    store = get_tenant_store(TENANT_ID, "kb")
+    rows = [row for row, a in enumerate(store.columns()["article_id"]) if a == article_id]
+    metadata, _ = store.fetch(rows)
+    return " ".join(meta["content"] for meta in metadata)
+
+
+def test_incremental_embeds_only_changed_articles(db, monkeypatch):
+    articles = [_create(db, f"Article {i}", f"Body of article {i} about subject {i}.") for i in range(5)]
+    tenant_kb_service.index_tenant_kb(db, TENANT_ID)
+
+    embedded = []
+    original = tenant_kb_service.embed_texts
+    monkeypatch.setattr(
+        tenant_kb_service, "embed_texts", lambda texts, **kw: embedded.append(len(texts)) or original(texts, **kw)
+    )
+    _edit(articles[1].id, "Fixed typo in the nginx guide.")
+    tenant_kb_service.delete_article(db, tenant_kb_service.get_article(db, TENANT_ID, articles[2].id))
+    db.expire_all()
+
+    assert tenant_kb_service.index_tenant_kb(db, TENANT_ID, incremental=True) == 1
+    assert embedded == [1]
+    assert "nginx" in _indexed_content(articles[1].id)
+    assert _indexed_content(articles[2].id) == ""
+    assert get_tenant_store(TENANT_ID, "kb").count == 4
+
+    # Nothing left to do: no embedding, no write
+    version = get_tenant_store(TENANT_ID, "kb").version
+    assert tenant_kb_service.index_tenant_kb(db, TENANT_ID, incremental=True) == 0
+    assert embedded == [1]
+    assert get_tenant_store(TENANT_ID, "kb").version == version
+
+
+def test_interleaved_incremental_runs_keep_the_newer_chunks(db, monkeypatch, caplog):
+    caplog.set_level("INFO", logger=tenant_kb_service.logger.name)
+    x = _create(db, "Article X", "Original text of article X.")
+    y = _create(db, "Article Y", "Original text of article Y.")
+    x_id, y_id = x.id, y.id
+    tenant_kb_service.index_tenant_kb(db, TENANT_ID)
+
+    original = tenant_kb_service.embed_texts
+    interleaved = []
+
+    def embed_then_run_b(texts, **kw):
+        # Run A has read its snapshot and is embedding; run B (after an edit to Y) completes first
+        if not interleaved:
+            interleaved.append(True)
+            _edit(y_id, "Edited text of article Y.")
+            session = SessionLocal()
+            try:
+                tenant_kb_service.index_tenant_kb(session, TENANT_ID, incremental=True)
+            finally:
+                session.close()
+        return original(texts, **kw)
+
+    monkeypatch.setattr(tenant_kb_service, "embed_texts", embed_then_run_b)
+    _edit(x_id, "Edited text of article X.")
+    db.expire_all()
+    tenant_kb_service.index_tenant_kb(db, TENANT_ID, incremental=True)
+
+    assert interleaved
+    assert "changed during indexing; retrying" in caplog.text  # A's stale swap was refused
+    assert "Edited text of article X" in _indexed_content(x_id)
+    assert "Edited text of article Y" in _indexed_content(y_id)
+    assert "Original" not in _indexed_content(y_id)
+
+    check = SessionLocal()
+    try:
+        assert check.query(KBArticle).filter(KBArticle.is_indexed == False).count() == 0  # noqa: E712
+    finally:
+        check.close()
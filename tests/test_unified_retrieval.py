@@ -0,0 +1,24 @@
+from app.services.embeddings import get_global_kb_store, get_tenant_store
+from app.services.knowledge.unified_retrieval import retrieve_context
+
+TENANT_ID = 1
+
+
+def test_hybrid_merge_ranks_relevant_hits_across_sources(db):
+    ssl_chunk = "Browsers show ERR_SSL_PROTOCOL_ERROR when the site's certificate or TLS setup is broken."
+    get_global_kb_store().add(
+        [ssl_chunk, "Point your nameservers at the hosting provider.", "Raise the PHP memory limit in php.ini."],
+        [{"source": "ssl.md"}, {"source": "dns.md"}, {"source": "php.md"}],
+    )
+    get_tenant_store(TENANT_ID, "examples").add(
+        [f"Customer Issue: invoice {i} was charged twice on my card" for i in range(10)],
+        [{"source": f"example_{i}"} for i in range(10)],
+    )
+
+    query = "ERR_SSL_PROTOCOL_ERROR on my site"
+    vector = retrieve_context(db, TENANT_ID, query, mode="vector")
+    hybrid = retrieve_context(db, TENANT_ID, query, mode="hybrid")
+
+    assert vector.merged[0].content == ssl_chunk
+    assert hybrid.merged[0].content == ssl_chunk
+    assert [r.score for r in hybrid.merged] == sorted((r.score for r in hybrid.merged), reverse=True)
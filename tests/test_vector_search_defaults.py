@@ -0,0 +1,34 @@
+import time
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.embeddings import get_tenant_store
+
+
+def _clustered(rng, rows, dim, clusters=50):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=rows)] + 2.0 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_default_search_matches_exact_search(index_dir):
+    settings = get_settings()
+    rng = np.random.default_rng(0)
+    rows, dim = 5000, settings.embedding_dimension
+    store = get_tenant_store(1, "kb")
+    store.add([f"chunk {i}" for i in range(rows)], [{"row": i} for i in range(rows)], embeddings=_clustered(rng, rows, dim))
+    store.compact()
+    if settings.vector_store_ann_min_rows and rows >= settings.vector_store_ann_min_rows:
+        deadline = time.monotonic() + 60
+        while store._ann is None and time.monotonic() < deadline:  # Built in the background
+            time.sleep(0.05)
+        assert store._ann is not None
+
+    hits = total = 0
+    for query in _clustered(rng, 50, dim):
+        default = {meta["row"] for meta, _ in store.search("", top_k=10, query_embedding=query)}
+        exact = {meta["row"] for meta, _ in store.search("", top_k=10, query_embedding=query, exact=True)}
+        hits += len(default & exact)
+        total += len(exact)
+    assert hits / total >= 0.95, f"recall@10 {hits / total:.3f} vs exact search at default settings"
@@ -0,0 +1,31 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.embeddings import FAISSStore, faiss_store
+
+
+@pytest.mark.parametrize("write", ["compact", "_save"])
+def test_searches_are_not_blocked_while_the_compact_copy_is_built(index_dir, monkeypatch, write):
+    store = FAISSStore("tenant_kb", tenant_id=1, dimension=32, storage="int8")
+    vectors = np.random.default_rng(0).standard_normal((200, 32)).astype(np.float32)
+    store.add([f"chunk {i}" for i in range(200)], [{"row": i} for i in range(200)], embeddings=vectors)
+
+    searched = []
+    original = faiss_store.quantize
+
+    def quantize_while_searching(base, storage):
+        search = threading.Thread(
+            target=lambda: searched.append(store.search("", top_k=1, query_embedding=vectors[3]))
+        )
+        search.start()
+        search.join(timeout=5)  # Would time out if quantizing held the store lock
+        return original(base, storage)
+
+    monkeypatch.setattr(faiss_store, "quantize", quantize_while_searching)
+    getattr(store, write)()
+
+    assert searched and searched[0][0][0]["row"] == 3
+    assert store._compact is not None and store._compact.shape == (200, 32)
+    assert store.search("", top_k=1, query_embedding=vectors[42])[0][0]["row"] == 42
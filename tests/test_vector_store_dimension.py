@@ -0,0 +1,31 @@
+import numpy as np
+
+from app.services.embeddings import FAISSStore
+
+
+def _add_rows(store, rows):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((rows, store.dimension)).astype(np.float32)
+    store.add([f"chunk {i}" for i in range(rows)], [{"row": i} for i in range(rows)], embeddings=vectors)
+    return vectors
+
+
+def test_segment_only_store_is_truncated_to_a_smaller_dimension(index_dir):
+    store = FAISSStore("tenant_examples", tenant_id=1, dimension=256)
+    vectors = _add_rows(store, 20)
+    assert not store.index_path.exists()  # Still below COMPACT_MIN_ROWS: segments only
+    store.close()
+
+    narrowed = FAISSStore("tenant_examples", tenant_id=1, dimension=64)
+    assert narrowed.count == 20
+    assert narrowed.dimension == 64
+    expected = vectors[:, :64] / np.linalg.norm(vectors[:, :64], axis=1, keepdims=True)
+    np.testing.assert_allclose(narrowed.embeddings, expected, atol=1e-5)
+    hits = narrowed.search("", top_k=1, query_embedding=vectors[7])
+    assert hits[0][0]["row"] == 7
+    narrowed.close()
+
+    # Configured back to full size: kept at the stored 64 until re-ingested
+    reopened = FAISSStore("tenant_examples", tenant_id=1, dimension=256)
+    assert reopened.count == 20
+    assert reopened.dimension == 64
@@ -0,0 +1,41 @@
+import threading
+
+from app.services.embeddings import FAISSStore, StoreChangedError
+
+
+def test_adds_during_rebuilds_are_not_lost(index_dir):
+    store = FAISSStore("tenant_examples", tenant_id=1, dimension=32)
+    source = [f"seed {i}" for i in range(40)]  # Stands in for the database rows an index is rebuilt from
+    source_lock = threading.Lock()
+    store.rebuild_from(lambda: (list(source), [{} for _ in source]))
+
+    def load():
+        with source_lock:
+            texts = list(source)
+        return texts, [{} for _ in texts]
+
+    def writer(n):
+        for i in range(50):
+            text = f"writer {n} add {i}"
+            with source_lock:
+                source.append(text)  # Committed first, then indexed, like approve_reply
+            store.add([text], [{}])
+
+    rebuilt = []
+
+    def rebuilder():
+        for _ in range(5):
+            try:
+                rebuilt.append(store.rebuild_from(load))
+            except StoreChangedError:
+                pass  # Gave up under constant writes; nothing was swapped in
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(3)] + [threading.Thread(target=rebuilder)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    store.refresh()
+    metadata, _ = store.fetch(range(store.count))
+    assert sorted(meta["content"] for meta in metadata) == sorted(source)
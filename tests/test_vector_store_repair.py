@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.services.embeddings import FAISSStore, StoreDataMissingError
+
+
+def _store():
+    return FAISSStore("tenant_examples", tenant_id=1, dimension=32)
+
+
+def _add(store, start, rows):
+    vectors = np.random.default_rng(start).standard_normal((rows, store.dimension)).astype(np.float32)
+    store.add([f"chunk {i}" for i in range(start, start + rows)], [{"row": i} for i in range(start, start + rows)], embeddings=vectors)
+
+
+def _segments(store):
+    return sorted(store.index_dir.glob("tenant_examples_seg*.npy"))
+
+
+def test_rows_left_by_a_crashed_add_are_dropped(index_dir):
+    store = _store()
+    _add(store, 0, 10)
+    # An add that died after writing metadata but before publishing its segment
+    store._meta.put(10, [{"content": "orphan"}] * 3)
+    store._lexical.put(10, ["orphan"] * 3)
+    store.close()
+
+    reopened = _store()
+    assert reopened.count == 10
+    assert reopened.verify()["ok"]
+    assert reopened._meta.stored_rows() == 10
+
+
+def test_unreadable_segment_is_kept_and_served_once_readable(index_dir):
+    store = _store()
+    _add(store, 0, 10)
+    _add(store, 10, 10)
+    store.close()
+    second = _segments(store)[1]
+    intact = second.read_bytes()
+    second.write_bytes(b"not a numpy file")  # e.g. a read failing under load
+
+    degraded = _store()
+    assert degraded.count == 10
+    assert second.exists()
+    assert degraded._meta.stored_rows() == 20
+    with pytest.raises(OSError):
+        _add(degraded, 20, 1)  # Publishing a manifest now would drop the unloaded segment
+    degraded.close()
+
+    second.write_bytes(intact)
+    recovered = _store()
+    assert recovered.count == 20
+    assert recovered.verify()["ok"]
+    assert recovered.fetch([15])[0][0]["row"] == 15
+
+
+def test_missing_segment_raises_instead_of_truncating(index_dir):
+    store = _store()
+    _add(store, 0, 10)
+    _add(store, 10, 10)
+    store.close()
+    _segments(store)[1].unlink()
+
+    with pytest.raises(StoreDataMissingError):
+        _store()
+    assert len(_segments(store)) == 1